@@ -1,7 +1,21 @@
+import asyncio
+import bisect
 import doctest
+import inspect
+import json
+import math
+import os
+import struct
+import sys
+import threading
 import time
+import tracemalloc
 from abc import abstractmethod, ABC
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import attrgetter
 from time import perf_counter
 from typing import Callable
 import random
@@ -82,6 +96,8 @@ class State:
 
 
 class Transition(ABC):
+    __slots__ = ('__next_state',)
+
     def __init__(self, next_state: 'State' = None):
         if isinstance(next_state, State):
             self.__next_state = next_state
@@ -120,7 +136,11 @@ class Transition(ABC):
 
 
 class State:
+    __slots__ = ('__parameters', '__transition', '__valid')
+
     class Parameters:
+        __slots__ = ('terminal', 'do_in_state_when_entering', 'do_in_state_action_when_exiting')
+
         def __init__(self, terminal: bool = False, do_in_state_when_entering: bool = False,
                      do_in_state_action_when_exiting: bool = False):
             self.terminal: bool = terminal
@@ -130,18 +150,17 @@ class State:
     def __init__(self, parameters: 'Parameters' = Parameters()) -> None:
         self.__parameters = parameters
         self.__transition: list['Transition'] = []
+        self.__valid: bool = True
 
     @property
     def get_transitionList(self):
         return self.__transition
 
+    # la validité est mise à jour à chaque ajout de transition, une transition ne pouvant devenir invalide
+    # une fois construite (ses mutateurs refusent tout intrant invalide)
     @property
     def is_valid(self) -> 'bool':
-        if len(self.__transition) >= 1:
-            for val in self.__transition:
-                if not val.is_valid:
-                    return False
-        return True
+        return self.__valid
 
     @property
     def is_terminal(self) -> bool:
@@ -156,9 +175,25 @@ class State:
         else:
             return None
 
+    # Moment (Clock.current) le plus tôt où une transition pourrait devenir active. None: il faut vérifier à chaque
+    # tick. math.inf: rien ne peut changer sans événement externe (voir FiniteStateMachine.notify).
+    @property
+    def next_deadline(self) -> float or None:
+        deadline = math.inf
+        for transition in self.__transition:
+            if not isinstance(transition, ConditionalTransition):
+                return None
+            transition_deadline = transition.condition.next_deadline
+            if transition_deadline is None:
+                return None
+            if transition_deadline < deadline:
+                deadline = transition_deadline
+        return deadline
+
     def add_transition(self, next_transition: 'Transition') -> None:
         if isinstance(next_transition, Transition):
             self.__transition.append(next_transition)
+            self.__valid = self.__valid and bool(next_transition.is_valid)
         else:
             raise Exception("Error: Expecting a Type Transition!")
 
@@ -185,6 +220,147 @@ class State:
         self._do_exiting_action()
 
 
+# Horloge injectable consultée par toutes les mesures de temps de la librairie (conditions temporisées, états et
+# transitions surveillés, boucles run). Clock.use(ManualClock()) permet par exemple de simuler des heures de
+# fonctionnement en quelques secondes, sans vrais sommeils.
+class Clock(ABC):
+    current: 'Clock' = None
+    # Pas de temps ajouté après chaque tick d'une boucle libre quand l'horloge n'avance pas d'elle-même.
+    # None: le temps passe seul (horloges réelles).
+    poll_interval: float or None = None
+
+    @staticmethod
+    def use(clock: 'Clock') -> 'Clock':
+        if not isinstance(clock, Clock):
+            raise Exception("Clock: Expecting Clock Input")
+        previous = Clock.current
+        Clock.current = clock
+        Condition._timing_generation += 1
+        return previous
+
+    @abstractmethod
+    def now(self) -> float:
+        pass
+
+    @abstractmethod
+    def sleep_until(self, deadline: float) -> None:
+        pass
+
+    # Attend l'événement au plus timeout secondes d'horloge (None: indéfiniment). Retourne l'état de l'événement.
+    @abstractmethod
+    def wait(self, event: threading.Event, timeout: float or None) -> bool:
+        pass
+
+    @abstractmethod
+    async def wait_async(self, event: asyncio.Event, timeout: float or None) -> None:
+        pass
+
+
+class RealClock(Clock):
+    SPIN_THRESHOLD = 0.001
+
+    now = staticmethod(perf_counter)
+
+    # Sommeil grossier puis attente active pour la dernière milliseconde: time.sleep seul peut dépasser
+    # l'échéance de plusieurs millisecondes sur le Pi.
+    def sleep_until(self, deadline: float) -> None:
+        remaining = deadline - perf_counter()
+        if remaining > RealClock.SPIN_THRESHOLD:
+            time.sleep(remaining - RealClock.SPIN_THRESHOLD)
+        while perf_counter() < deadline:
+            pass
+
+    def wait(self, event: threading.Event, timeout: float or None) -> bool:
+        return event.wait(timeout)
+
+    async def wait_async(self, event: asyncio.Event, timeout: float or None) -> None:
+        if timeout is None:
+            await event.wait()
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+# Le temps n'avance que par advance()/set_time() ou quand une boucle attend: l'attente saute directement à
+# l'échéance. Une boucle run() libre avance de poll_interval après chaque tick dont l'échéance est inconnue.
+# Attendre sans échéance lève une exception: rien ne pourrait faire avancer le temps.
+class ManualClock(Clock):
+    def __init__(self, start_time: float = 0.0, poll_interval: float = 0.001) -> None:
+        if not isinstance(start_time, float):
+            raise Exception("Start_Time: Expecting Float Input")
+        if not isinstance(poll_interval, float) or poll_interval <= 0:
+            raise Exception("Poll_Interval: Expecting Positive Float Input")
+        self.__time = start_time
+        self.poll_interval = poll_interval
+
+    def now(self) -> float:
+        return self.__time
+
+    def advance(self, duration: float) -> None:
+        if not isinstance(duration, float) or duration < 0:
+            raise Exception("Duration: Expecting Positive Float Input")
+        self.__time += duration
+
+    def set_time(self, new_time: float) -> None:
+        if not isinstance(new_time, float) or new_time < self.__time:
+            raise Exception("New_Time: Expecting Float Input Not In The Past")
+        self.__time = new_time
+
+    def sleep_until(self, deadline: float) -> None:
+        if deadline > self.__time:
+            self.__time = deadline
+
+    def wait(self, event: threading.Event, timeout: float or None) -> bool:
+        if event.is_set():
+            return True
+        if timeout is None:
+            raise Exception("Timeout: ManualClock Cannot Wait Without A Deadline Or Time Budget")
+        if timeout > 0:
+            self.__time += timeout
+        return event.is_set()
+
+    async def wait_async(self, event: asyncio.Event, timeout: float or None) -> None:
+        if not event.is_set():
+            if timeout is None:
+                raise Exception("Timeout: ManualClock Cannot Wait Without A Deadline Or Time Budget")
+            if timeout > 0:
+                self.__time += timeout
+        await asyncio.sleep(0)
+
+
+# Temps réel multiplié par un facteur: les sommeils réels sont divisés d'autant.
+class AcceleratedClock(Clock):
+    def __init__(self, factor: float) -> None:
+        if not isinstance(factor, float) or factor <= 0:
+            raise Exception("Factor: Expecting Positive Float Input")
+        self.__factor = factor
+        self.__real_origin = perf_counter()
+        self.__origin = Clock.current.now() if Clock.current is not None else self.__real_origin
+
+    @property
+    def factor(self) -> float:
+        return self.__factor
+
+    def now(self) -> float:
+        return self.__origin + (perf_counter() - self.__real_origin) * self.__factor
+
+    def sleep_until(self, deadline: float) -> None:
+        remaining = (deadline - self.now()) / self.__factor
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def wait(self, event: threading.Event, timeout: float or None) -> bool:
+        return event.wait(None if timeout is None else timeout / self.__factor)
+
+    async def wait_async(self, event: asyncio.Event, timeout: float or None) -> None:
+        await RealClock.wait_async(self, event, None if timeout is None else timeout / self.__factor)
+
+
+Clock.current = RealClock()
+
+
 StateList = list
 ConditionList = list
 
@@ -196,22 +372,73 @@ class FiniteStateMachine:
         RUNNING = 3
         TERMINAL_REACHED = 4
 
+    _RUNNING = OperationalState.RUNNING
+    # Pas d'attente de run(event_driven=True) quand l'échéance de l'état est inconnue (télécommande, télémètre,
+    # action dans l'état) et que ni run() ni l'horloge n'en donnent un: sans lui, la boucle tournerait à vide.
+    EVENT_POLL_INTERVAL = 0.001
+    # un événement par boucle run() en cours: notify() les réveille toutes, aucune n'efface celui d'une autre
+    _wake_events: list = []
+    _async_wake_events: list = []
+    _pending_awaitables: list or None = None
+
+    class RunStatistics:
+        def __init__(self, rate_hz: float = None) -> None:
+            self.rate_hz: float or None = rate_hz
+            self.period: float or None = None if rate_hz is None else 1.0 / rate_hz
+            self.tick_count: int = 0
+            self.overrun_count: int = 0
+            self.max_jitter: float = 0.0
+            self.total_jitter: float = 0.0
+            self.elapsed_time: float = 0.0
+
+        @property
+        def mean_jitter(self) -> float:
+            return self.total_jitter / self.tick_count if self.tick_count > 0 else 0.0
+
+        @property
+        def achieved_rate(self) -> float:
+            return self.tick_count / self.elapsed_time if self.elapsed_time > 0 else 0.0
+
+        def _record_tick(self, jitter: float) -> None:
+            self.tick_count += 1
+            self.total_jitter += jitter
+            if jitter > self.max_jitter:
+                self.max_jitter = jitter
+
+        def _record_overrun(self) -> None:
+            self.overrun_count += 1
+
+        def _finish(self, elapsed_time: float) -> None:
+            self.elapsed_time = elapsed_time
+
+        def __str__(self) -> str:
+            return "Ticks: {} | Rate: {:.1f} Hz (target: {}) | Jitter: mean {:.1f} us, max {:.1f} us | " \
+                   "Overruns: {}".format(self.tick_count, self.achieved_rate,
+                                         "none" if self.rate_hz is None else "{:.1f} Hz".format(self.rate_hz),
+                                         self.mean_jitter * 1e6, self.max_jitter * 1e6, self.overrun_count)
+
     class Layout:
         def __init__(self) -> None:
             self.states = []
+            self._state_index = set()
             self._initial_state = None
-
+            self._validity = None
+            # identifiants déjà donnés par un freeze() précédent, gardés par thaw()
+            self._assigned_states = ()
+            self._assigned_transition_ids = {}
+            self._histograms_enabled = False
+            self.thaw()
+
+        # calculée au besoin puis gardée en cache jusqu'au prochain ajout d'état ou changement d'état initial
         @property
         def is_valid(self) -> bool:
-            validity = False
-            if self.states.__contains__(self.initial_state):
-                for a_state in self.states:
-                    if a_state.is_valid:
-                        validity = True
-                    else:
-                        validity = False
+            if self._validity is None:
+                self._validity = self._initial_state in self._state_index \
+                                 and all(a_state.is_valid for a_state in self.states)
+            return self._validity
 
-            return validity
+        def __contains__(self, state: 'State') -> bool:
+            return state in self._state_index
 
         @property
         def initial_state(self) -> 'State':
@@ -223,12 +450,16 @@ class FiniteStateMachine:
                 raise Exception("New_State: Expecting State Input")
             if new_state.is_valid:
                 self._initial_state = new_state
+                self._validity = None
 
         def add_state(self, new_state: 'State') -> None:
             if not isinstance(new_state, State):
                 raise Exception("New_State: Expecting State Input")
-            if new_state.is_valid:
+            if new_state.is_valid and new_state not in self._state_index:
                 self.states.append(new_state)
+                self._state_index.add(new_state)
+                self._validity = None
+                self.thaw()
 
         def add_states(self, list_states: StateList) -> None:
             if not isinstance(list_states, list):
@@ -238,11 +469,133 @@ class FiniteStateMachine:
                     raise Exception("Error: At Least One Element of List_State Is Not A State")
 
             for a_state in list_states:
-                if a_state.is_valid:
+                if a_state.is_valid and a_state not in self._state_index:
                     self.states.append(a_state)
+                    self._state_index.add(a_state)
+            self._validity = None
+            self.thaw()
 
                     # les setters, on veut trap les erreurs le plus vite possible: is instance, raise exeption is false
 
+        @property
+        def is_frozen(self) -> bool:
+            return self._dispatch_table is not None
+
+        @property
+        def dispatch_table(self) -> tuple or None:
+            return self._dispatch_table
+
+        def state_id(self, state: 'State') -> int or None:
+            return self._state_ids.get(state)
+
+        def state_by_id(self, state_id: int) -> 'State':
+            return self._frozen_states[state_id]
+
+        def transition_id(self, transition: 'Transition') -> int or None:
+            return self._transition_ids.get(transition)
+
+        # Compile le layout: chaque état (incluant ceux seulement atteignables par une transition) reçoit un
+        # identifiant entier dense et sa liste de transitions devient une rangée de tuples
+        # (condition, next_state_id, transition). next_state_id vaut -1 pour une RemoteDispatchTransition. Ajouter des transitions à un état après freeze() n'est pas vu:
+        # il faut rappeler freeze(). Ajouter un état au layout le dégèle automatiquement.
+        # Un nouveau freeze() garde les identifiants déjà donnés et numérote les nouveaux états et transitions à la
+        # suite: les traces du TransitionRecorder, les étiquettes du MetricsRegistry et les tables d'une
+        # BatchFiniteStateMachine construites avant restent justes.
+        def freeze(self) -> 'FiniteStateMachine.Layout':
+            if not self.is_valid:
+                raise Exception("Layout: Cannot Freeze An Invalid Layout")
+            frozen_states = list(self._assigned_states)
+            state_ids = {a_state: state_id for state_id, a_state in enumerate(frozen_states)}
+            visited = set()
+            pending = [self._initial_state] + self.states
+            while pending:
+                a_state = pending.pop()
+                if a_state in visited:
+                    continue
+                visited.add(a_state)
+                if a_state not in state_ids:
+                    state_ids[a_state] = len(frozen_states)
+                    frozen_states.append(a_state)
+                for transition in a_state.get_transitionList:
+                    pending.append(transition.next_state)
+                    if isinstance(transition, RemoteDispatchTransition):
+                        pending.extend(transition.bindings.values())
+
+            dispatch_table = []
+            transition_ids = dict(self._assigned_transition_ids)
+            for a_state in frozen_states:
+                row = []
+                for transition in a_state.get_transitionList:
+                    if isinstance(transition, RemoteDispatchTransition):
+                        # destination choisie au tick par la touche: next_state_id -1, voir transition.next_state
+                        row.append((None, -1, transition))
+                    else:
+                        condition = transition.condition if isinstance(transition, ConditionalTransition) else None
+                        row.append((condition, state_ids[transition.next_state], transition))
+                    if transition not in transition_ids:
+                        transition_ids[transition] = len(transition_ids)
+                dispatch_table.append(tuple(row))
+
+            self._assigned_states = tuple(frozen_states)
+            self._assigned_transition_ids = dict(transition_ids)
+            self._frozen_states = tuple(frozen_states)
+            self._state_ids = state_ids
+            self._transition_ids = transition_ids
+            self._terminal_flags = tuple(a_state.is_terminal for a_state in frozen_states)
+            self._timer_only_flags = tuple(len(row) > 0 and all(FiniteStateMachine.Layout._is_timer(condition)
+                                                                for condition, next_state_id, transition in row)
+                                           for row in dispatch_table)
+            self._dispatch_table = tuple(dispatch_table)
+            if self._histograms_enabled:
+                self.__enable_state_histograms(frozen_states)
+            return self
+
+        # Condition qui ne dépend que du temps: fausse avant son échéance, connue d'avance.
+        @staticmethod
+        def _is_timer(condition: 'Condition' or None) -> bool:
+            if condition is None or condition.inverse:
+                return False
+            if isinstance(condition, (TimedCondition, StateEntryDurationCondition)):
+                return True
+            if isinstance(condition, (AllConditions, AnyConditions)):
+                return len(condition._conditions) > 0 \
+                    and all(FiniteStateMachine.Layout._is_timer(child) for child in condition._conditions)
+            return False
+
+        # Active les histogrammes de chaque état et transition surveillés, régions comprises. Les états ajoutés
+        # ensuite (sous-graphes construits à la demande d'un Blinker) sont activés à leur freeze().
+        def enable_histograms(self) -> None:
+            self._histograms_enabled = True
+            self.__enable_state_histograms(self._frozen_states if self._frozen_states
+                                           else [self._initial_state] + self.states)
+
+        @staticmethod
+        def __enable_state_histograms(states: list or tuple) -> None:
+            for a_state in states:
+                if a_state is None:
+                    continue
+                if isinstance(a_state, MonitoredState):
+                    a_state.enable_histograms()
+                for transition in a_state.get_transitionList:
+                    if isinstance(transition, MonitoredTransition):
+                        transition.enable_histograms()
+                if isinstance(a_state, CompositeState) and a_state.region is not None:
+                    a_state.region.layout.enable_histograms()
+
+        # Temps par état surveillé (voir MonitoredState.time_statistics), une ligne par état
+        def time_report(self) -> str:
+            states = self._frozen_states if self._frozen_states else self.states
+            return "\n".join("{} | {}".format(index, a_state.time_statistics())
+                             for index, a_state in enumerate(states) if isinstance(a_state, MonitoredState))
+
+        def thaw(self) -> None:
+            self._dispatch_table = None
+            self._frozen_states = ()
+            self._terminal_flags = ()
+            self._timer_only_flags = ()
+            self._state_ids = {}
+            self._transition_ids = {}
+
     def __init__(self, layout_parameter: 'Layout', uninitialized: bool = True) -> None:  # do typing layout:Layout
         if not isinstance(layout_parameter, FiniteStateMachine.Layout):
             raise Exception("Layout_Parameter: Expecting Layout Input")
@@ -254,9 +607,22 @@ class FiniteStateMachine:
         else:
             raise Exception("Layout_Parameter: Layout Input Is Invalid")
         self.__current_applicative_state = None
+        self.__current_state_id = None
+        self.__state_id_table = None
+        self.__last_run_statistics = None
+        self.__recorder = None
+        self.__recorder_id = -1
+        self.__skip_until = 0.0
+        self.__skip_state_id = -1
+        self.__skip_generation = -1
+        self.__tick_count = 0
         self.__current_operational_state = self.OperationalState.UNINITIALIZED if uninitialized \
             else self.OperationalState.IDLE
 
+    @property
+    def layout(self) -> 'FiniteStateMachine.Layout':
+        return self.__layout
+
     @property
     def current_applicative_state(self) -> 'State':
         return self.__current_applicative_state
@@ -265,29 +631,251 @@ class FiniteStateMachine:
     def current_operational_state(self) -> 'OperationalState':
         return self.__current_operational_state
 
-    def run(self, reset: bool = True, time_budget: float = None) -> None:
+    @property
+    def next_deadline(self) -> float or None:
+        if self.__current_operational_state == self.OperationalState.UNINITIALIZED \
+                or self.__current_operational_state == self.OperationalState.TERMINAL_REACHED:
+            return None
+        return self.__current_applicative_state.next_deadline
+
+    # Réveille toute boucle run(event_driven=True) en attente, par exemple après avoir modifié une valeur
+    # surveillée par une ValueCondition ou une StateValueCondition depuis un autre fil d'exécution.
+    @staticmethod
+    def notify() -> None:
+        for event in list(FiniteStateMachine._wake_events):
+            event.set()
+        for loop, event in FiniteStateMachine._async_wake_events:
+            loop.call_soon_threadsafe(event.set)
+
+    # Une action (d'état ou de transition) peut retourner un awaitable: il est attendu par track_async à la fin
+    # du tick. Hors de track_async, personne ne pourrait l'attendre.
+    @staticmethod
+    def _defer_awaitable(result: any) -> None:
+        if not inspect.isawaitable(result):
+            return
+        if FiniteStateMachine._pending_awaitables is None:
+            if inspect.iscoroutine(result):
+                result.close()
+            raise Exception("Action: Awaitable Action Requires track_async")
+        FiniteStateMachine._pending_awaitables.append(result)
+
+    @staticmethod
+    def _earliest_deadline(*deadlines: float or None) -> float or None:
+        earliest = math.inf
+        for deadline in deadlines:
+            if deadline is None:
+                return None
+            if deadline < earliest:
+                earliest = deadline
+        return earliest
+
+    @property
+    def last_run_statistics(self) -> 'FiniteStateMachine.RunStatistics' or None:
+        return self.__last_run_statistics
+
+    # Nombre d'appels à track() depuis la création
+    @property
+    def tick_count(self) -> int:
+        return self.__tick_count
+
+    @property
+    def recorder(self) -> 'TransitionRecorder' or None:
+        return self.__recorder
+
+    # Appelé par TransitionRecorder.attach()/detach()
+    def _set_recorder(self, recorder: 'TransitionRecorder' or None, recorder_id: int) -> None:
+        self.__recorder = recorder
+        self.__recorder_id = recorder_id
+
+    # poll_interval: attente après un tick dont l'échéance est inconnue, comme pour run_async. 0.0: celui de
+    # l'horloge, sinon EVENT_POLL_INTERVAL en mode event_driven.
+    def run(self, reset: bool = True, time_budget: float = None, event_driven: bool = False,
+            rate_hz: float = None, poll_interval: float = 0.0) -> 'FiniteStateMachine.RunStatistics':
         if not isinstance(reset, bool):
             raise Exception("Reset: Expecting Bool Input")
 
         if time_budget is not None:
             if not isinstance(time_budget, float):
                 raise Exception("Time_Budget: Expecting Float Input")
-        self.test_timer = time.perf_counter()
-        start_time = perf_counter()
+        if not isinstance(event_driven, bool):
+            raise Exception("Event_Driven: Expecting Bool Input")
+        if rate_hz is not None:
+            if isinstance(rate_hz, bool) or not isinstance(rate_hz, (int, float)) or rate_hz <= 0:
+                raise Exception("Rate_Hz: Expecting Positive Number Input")
+            if event_driven:
+                raise Exception("Rate_Hz: Cannot Be Combined With Event_Driven")
+        if not isinstance(poll_interval, float) or poll_interval < 0:
+            raise Exception("Poll_Interval: Expecting Non Negative Float Input")
+        self.test_timer = Clock.current.now()
+        start_time = Clock.current.now()
         current_track_state = True
+        statistics = FiniteStateMachine.RunStatistics(rate_hz)
+        self.__last_run_statistics = statistics
 
         if reset:
             self.reset()
         if self.__current_operational_state is not self.OperationalState.TERMINAL_REACHED \
                 or self.__current_operational_state is not self.OperationalState.UNINITIALIZED:
-            while current_track_state and (time_budget is None or perf_counter() - start_time < time_budget):
-                current_track_state = self.track()
+            scheduled_time = Clock.current.now()
+            wake_event = threading.Event()
+            FiniteStateMachine._wake_events.append(wake_event)
+            try:
+                while current_track_state and (time_budget is None
+                                               or Clock.current.now() - start_time < time_budget):
+                    wake_event.clear()
+                    SensorSampleCache.advance_tick()
+                    tick_time = Clock.current.now()
+                    current_track_state = self.track()
+                    if rate_hz is not None:
+                        statistics._record_tick(tick_time - scheduled_time)
+                        scheduled_time += statistics.period
+                        if Clock.current.now() > scheduled_time:
+                            # on ne rattrape pas les ticks manqués, on repart du moment présent
+                            statistics._record_overrun()
+                            scheduled_time = Clock.current.now()
+                        else:
+                            FiniteStateMachine._wait_until(scheduled_time)
+                    else:
+                        statistics._record_tick(0.0)
+                        if current_track_state and (event_driven or poll_interval > 0
+                                                    or Clock.current.poll_interval is not None):
+                            self.__wait_next_deadline(wake_event, start_time, time_budget, poll_interval)
+            finally:
+                FiniteStateMachine._wake_events.remove(wake_event)
+            self.stop()
+        statistics._finish(Clock.current.now() - start_time)
+        return statistics
+
+    async def track_async(self) -> bool:
+        return await FiniteStateMachine._await_actions_of(self.track)
+
+    async def reset_async(self) -> None:
+        await FiniteStateMachine._await_actions_of(self.reset)
+
+    # La fonction est synchrone: aucune autre coroutine ne peut s'exécuter pendant la collecte.
+    @staticmethod
+    async def _await_actions_of(function: Callable) -> any:
+        pending_awaitables = []
+        FiniteStateMachine._pending_awaitables = pending_awaitables
+        try:
+            result = function()
+        finally:
+            FiniteStateMachine._pending_awaitables = None
+        for awaitable in pending_awaitables:
+            await awaitable
+        return result
+
+    async def run_async(self, reset: bool = True, time_budget: float = None, rate_hz: float = None,
+                        poll_interval: float = 0.0) -> 'FiniteStateMachine.RunStatistics':
+        if not isinstance(reset, bool):
+            raise Exception("Reset: Expecting Bool Input")
+        if time_budget is not None:
+            if not isinstance(time_budget, float):
+                raise Exception("Time_Budget: Expecting Float Input")
+        if rate_hz is not None:
+            if isinstance(rate_hz, bool) or not isinstance(rate_hz, (int, float)) or rate_hz <= 0:
+                raise Exception("Rate_Hz: Expecting Positive Number Input")
+        if not isinstance(poll_interval, float):
+            raise Exception("Poll_Interval: Expecting Float Input")
+
+        wake_event = asyncio.Event()
+        registration = (asyncio.get_running_loop(), wake_event)
+        FiniteStateMachine._async_wake_events.append(registration)
+        start_time = Clock.current.now()
+        statistics = FiniteStateMachine.RunStatistics(rate_hz)
+        self.__last_run_statistics = statistics
+        try:
+            if reset:
+                await self.reset_async()
+            current_track_state = True
+            scheduled_time = Clock.current.now()
+            while current_track_state and (time_budget is None or Clock.current.now() - start_time < time_budget):
+                wake_event.clear()
+                SensorSampleCache.advance_tick()
+                tick_time = Clock.current.now()
+                current_track_state = await self.track_async()
+                if rate_hz is not None:
+                    statistics._record_tick(tick_time - scheduled_time)
+                    scheduled_time += statistics.period
+                    if Clock.current.now() > scheduled_time:
+                        statistics._record_overrun()
+                        scheduled_time = Clock.current.now()
+                    deadline = scheduled_time
+                else:
+                    statistics._record_tick(0.0)
+                    deadline = self.next_deadline
+                    if deadline is None:
+                        if poll_interval > 0 or Clock.current.poll_interval is None:
+                            deadline = Clock.current.now() + poll_interval
+                        else:
+                            deadline = Clock.current.now() + Clock.current.poll_interval
+                if time_budget is not None and start_time + time_budget < deadline:
+                    deadline = start_time + time_budget
+                if current_track_state:
+                    await FiniteStateMachine.__sleep_async(wake_event, deadline)
             self.stop()
+        finally:
+            FiniteStateMachine._async_wake_events.remove(registration)
+        statistics._finish(Clock.current.now() - start_time)
+        return statistics
+
+    @staticmethod
+    async def __sleep_async(wake_event: asyncio.Event, deadline: float) -> None:
+        if deadline == math.inf:
+            await Clock.current.wait_async(wake_event, None)
+            return
+        timeout = deadline - Clock.current.now()
+        if timeout <= 0:
+            await asyncio.sleep(0)
+            return
+        await Clock.current.wait_async(wake_event, timeout)
+
+    # Plusieurs machines sur une même boucle d'événements, chacune à son propre rythme.
+    @staticmethod
+    async def run_all_async(machines: list, reset: bool = True, time_budget: float = None) -> list:
+        if not isinstance(machines, list):
+            raise Exception("Machines: Expecting List Input")
+        for machine in machines:
+            if not isinstance(machine, FiniteStateMachine):
+                raise Exception("Error: At Least One Element Of Machines Is Not A FiniteStateMachine")
+        return await asyncio.gather(*[machine.run_async(reset=reset, time_budget=time_budget)
+                                      for machine in machines])
+
+    @staticmethod
+    def _wait_until(deadline: float) -> None:
+        Clock.current.sleep_until(deadline)
+
+    def __wait_next_deadline(self, wake_event: threading.Event, start_time: float, time_budget: float or None,
+                             poll_interval: float) -> None:
+        deadline = self.next_deadline
+        if deadline is None:
+            if poll_interval > 0:
+                deadline = Clock.current.now() + poll_interval
+            elif Clock.current.poll_interval is not None:
+                deadline = Clock.current.now() + Clock.current.poll_interval
+            else:
+                deadline = Clock.current.now() + FiniteStateMachine.EVENT_POLL_INTERVAL
+        if time_budget is not None and start_time + time_budget < deadline:
+            deadline = start_time + time_budget
+        if deadline == math.inf:
+            Clock.current.wait(wake_event, None)
+        else:
+            timeout = deadline - Clock.current.now()
+            if timeout > 0:
+                Clock.current.wait(wake_event, timeout)
 
     def track(self) -> bool:
+        self.__tick_count += 1
+        # chemin rapide: layout gelé et état courant connu de la table de dispatch
+        if self.__current_state_id is not None and self.__state_id_table is self.__layout._dispatch_table:
+            self.__current_operational_state = FiniteStateMachine._RUNNING
+            self.__track_frozen()
+            return True
+
         if self.__current_operational_state == self.OperationalState.UNINITIALIZED:
             self.__current_applicative_state = self.__layout.initial_state
             self.__current_operational_state = self.OperationalState.IDLE
+            self.__sync_state_id()
             self.__current_applicative_state._exec_entering_action()
 
         if self.__current_operational_state == self.OperationalState.TERMINAL_REACHED:
@@ -296,6 +884,12 @@ class FiniteStateMachine:
 
         else:
             self.__current_operational_state = self.OperationalState.RUNNING
+            if self.__layout._dispatch_table is not None:
+                self.__sync_state_id()
+                if self.__current_state_id is not None:
+                    self.__track_frozen()
+                    return True
+
             transition = self.__current_applicative_state.is_transiting
 
             if transition is not None:
@@ -305,12 +899,68 @@ class FiniteStateMachine:
                 self.__current_applicative_state._exec_in_state_action()
             return True
 
+    # Aucune validation ni isinstance ici: tout a été vérifié par Layout.freeze().
+    # Un état dont toutes les sorties sont des minuteries n'évalue pas ses conditions avant la plus proche
+    # échéance. Un seul état est actif par machine: l'index des échéances se réduit à un moment en cache,
+    # recalculé au changement d'état ou quand Condition._timing_generation change.
+    def __track_frozen(self) -> None:
+        layout = self.__layout
+        state_id = self.__current_state_id
+        if layout._timer_only_flags[state_id]:
+            if self.__skip_state_id != state_id or self.__skip_generation != Condition._timing_generation:
+                self.__skip_state_id = state_id
+                self.__skip_generation = Condition._timing_generation
+                self.__skip_until = min(condition.next_deadline
+                                        for condition, next_state_id, transition in layout._dispatch_table[state_id])
+            if Clock.current.now() < self.__skip_until:
+                self.__current_applicative_state._exec_in_state_action()
+                return
+
+        for condition, next_state_id, transition in layout._dispatch_table[state_id]:
+            if condition is None:
+                if not transition.is_transiting():
+                    continue
+            elif not condition:
+                continue
+
+            if next_state_id < 0:
+                next_state_id = layout._state_ids.get(transition.next_state)
+                if next_state_id is None:
+                    # touche liée après freeze() vers un état hors du layout gelé: on regèle, les identifiants
+                    # existants ne changent pas et le nouvel état est numéroté à la suite
+                    layout.freeze()
+                    next_state_id = layout._state_ids[transition.next_state]
+            self.__current_applicative_state._exec_exiting_action()
+            transition._exec_transiting_action()
+            if self.__recorder is not None:
+                self.__recorder._record(self.__recorder_id, self.__current_state_id, next_state_id,
+                                        layout._transition_ids[transition])
+            self.__current_applicative_state = layout._frozen_states[next_state_id]
+            if layout._terminal_flags[next_state_id]:
+                self.__current_operational_state = self.OperationalState.TERMINAL_REACHED
+                self.__current_state_id = None
+            else:
+                self.__current_state_id = next_state_id
+            self.__current_applicative_state._exec_entering_action()
+            break
+        self.__current_applicative_state._exec_in_state_action()
+
+    # L'identifiant n'est valide que pour la table avec laquelle il a été obtenu et jamais dans un état terminal.
+    def __sync_state_id(self) -> None:
+        self.__state_id_table = self.__layout._dispatch_table
+        self.__skip_state_id = -1
+        if self.__current_operational_state == self.OperationalState.TERMINAL_REACHED:
+            self.__current_state_id = None
+        else:
+            self.__current_state_id = self.__layout.state_id(self.__current_applicative_state)
+
     def stop(self) -> None:
         self.__current_operational_state = self.OperationalState.IDLE
 
     def reset(self) -> None:
         self.__current_operational_state = self.OperationalState.IDLE
         self.__current_applicative_state = self.__layout.initial_state
+        self.__sync_state_id()
         self.__current_applicative_state._exec_entering_action()  # ON PUISSE REPARTE LA BOUCLE WHILE DE RUN
 
     def transit_to(self, state: 'State') -> None:
@@ -318,9 +968,15 @@ class FiniteStateMachine:
             raise Exception("State: Expecting State Type")
         if self.__current_applicative_state is not None:
             self.__current_applicative_state._exec_exiting_action()
+        if self.__recorder is not None:
+            state_ids = self.__layout._state_ids
+            self.__recorder._record(self.__recorder_id, state_ids.get(self.__current_applicative_state, -1),
+                                    state_ids.get(state, -1), -1)
         self.__current_applicative_state = state
         self.__current_operational_state = FiniteStateMachine.OperationalState.IDLE
+        self.__sync_state_id()
         self.__current_applicative_state._exec_entering_action()
+        FiniteStateMachine.notify()
 
     def _transit_by(self, transition: 'Transition') -> None:
 
@@ -330,7 +986,13 @@ class FiniteStateMachine:
             self.__current_operational_state = self.OperationalState.TERMINAL_REACHED
         self.__current_applicative_state._exec_exiting_action()
         transition._exec_transiting_action()
+        if self.__recorder is not None:
+            state_ids = self.__layout._state_ids
+            self.__recorder._record(self.__recorder_id, state_ids.get(self.__current_applicative_state, -1),
+                                    state_ids.get(transition.next_state, -1),
+                                    self.__layout._transition_ids.get(transition, -1))
         self.__current_applicative_state = transition.next_state
+        self.__sync_state_id()
         self.__current_applicative_state._exec_entering_action()
 
     @staticmethod
@@ -344,8 +1006,9 @@ class FiniteStateMachine:
             raise Exception("Destination_State: Expecting MonitoredState Input (Or Child Of)")
         state_entry_duration_condition = StateEntryDurationCondition(duration=duration,
                                                                      monitered_state=original_state)
-        conditional_transition = ConditionalTransition(condition=state_entry_duration_condition,
-                                                       next_state=destination_state)
+        # transition surveillée: cadence des clignotements (interval_histogram)
+        conditional_transition = MonitoredTransition(condition=state_entry_duration_condition,
+                                                     next_state=destination_state)
         original_state.add_transition(next_transition=conditional_transition)
 
         return conditional_transition.condition
@@ -366,8 +1029,8 @@ class FiniteStateMachine:
 
         state_entry_duration_condition = StateEntryDurationCondition(duration=1.0,
                                                                      monitered_state=ownerState)
-        conditional_transition = ConditionalTransition(condition=state_entry_duration_condition,
-                                                       next_state=destination_state)
+        conditional_transition = MonitoredTransition(condition=state_entry_duration_condition,
+                                                     next_state=destination_state)
         original_state.add_transition(next_transition=conditional_transition)
 
         return conditional_transition.condition
@@ -416,25 +1079,801 @@ class FiniteStateMachine:
             raise Exception("RemoteControl: Expecting ", remotecontrol.__class__.__name__, " Input")
 
         
-        # la validation d'entré de expected value se fait dans la remote_value_condition
-
-        remote_value_condition = RemoteValueCondition(expectedValue, remotecontrol)
-        remote_transition = RemoteControlTransition(remote_value_condition, destination_state, remotecontrol)
+        # une seule RemoteDispatchTransition par état et par télécommande: chaque nouvelle touche y est ajoutée
+        # (une recherche par tick, peu importe le nombre de touches). Lier deux fois la même touche est une erreur.
+        for transition in original_state.get_transitionList:
+            if isinstance(transition, RemoteDispatchTransition) and transition.remote_control is remotecontrol:
+                if expectedValue in transition.bindings:
+                    raise Exception("ExpectedValue: Key '{}' Is Already Bound From This State".format(expectedValue))
+                transition.bind(expectedValue, destination_state)
+                return
+        remote_transition = RemoteDispatchTransition(remotecontrol, expectedValue, destination_state)
         original_state.add_transition(remote_transition)
 
     @staticmethod
-    def _brown_link( distance_sensor,original_state: 'RobotState', destination_state: 'RobotState',distance_max_value:int= 2000): #TODO: distance sensor typing
+    def _brown_link( distance_sensor,original_state: 'RobotState', destination_state: 'RobotState',distance_max_value:int= 2000,
+                    distance_filter: 'DistanceFilter' = None, exit_distance: int = None): #TODO: distance sensor typing
         if not isinstance(original_state, RobotState):
             raise Exception("Original_State: Expecting RobotState Input")
 
         if not isinstance(destination_state, RobotState):
             raise Exception("Destination_State: Expecting RobotState Input")
 
-        distance_sensor_condition = DistanceSenserCondition(distance_max_value,distance_sensor)
+        # avec un filtre, la lecture brute est remplacée par la distance filtrée avec hystérésis
+        if distance_filter is not None:
+            distance_sensor_condition = FilteredDistanceCondition(distance_filter, distance_max_value, exit_distance,
+                                                                  owner_state=original_state)
+        else:
+            distance_sensor_condition = DistanceSenserCondition(distance_max_value,distance_sensor)
         remote_transition = ConditionalTransition(distance_sensor_condition,destination_state)
         original_state.add_transition(remote_transition)
 
 
+# Ordonnanceur de plusieurs machines (tout objet ayant une méthode track()), chacune à son propre rythme.
+# Les machines sont servies par priorité décroissante et un tick moins prioritaire n'est pas démarré si son
+# coût moyen le ferait déborder sur l'échéance d'une machine plus prioritaire (sauf s'il est déjà en retard
+# d'une période complète, pour ne pas l'affamer).
+class Executive:
+    class Entry:
+        def __init__(self, machine: any, rate_hz: float, priority: int, primary: bool = False) -> None:
+            self.machine: any = machine
+            self.primary: bool = primary
+            self.rate_hz: float = rate_hz
+            self.period: float = 1.0 / rate_hz
+            self.priority: int = priority
+            self.next_due: float = 0.0
+            self.tick_count: int = 0
+            self.deferral_count: int = 0
+            self.overrun_count: int = 0
+            self.mean_cost: float = 0.0
+            self.max_cost: float = 0.0
+
+        def _record_cost(self, cost: float) -> None:
+            self.tick_count += 1
+            self.mean_cost += (cost - self.mean_cost) * 0.1
+            if cost > self.max_cost:
+                self.max_cost = cost
+
+    def __init__(self) -> None:
+        self.__entries: list['Executive.Entry'] = []
+        self.__running: bool = False
+
+    @property
+    def entries(self) -> list:
+        return list(self.__entries)
+
+    # primary: la fin de cette machine (track() retourne False) arrête run(), même si d'autres machines, comme des
+    # clignotants dont track() ne retourne rien, sont encore inscrites.
+    def register(self, machine: any, rate_hz: float, priority: int = 0, primary: bool = False) -> 'Executive.Entry':
+        if not callable(getattr(machine, 'track', None)):
+            raise Exception("Machine: Expecting An Object With A track() Method")
+        if isinstance(rate_hz, bool) or not isinstance(rate_hz, (int, float)) or rate_hz <= 0:
+            raise Exception("Rate_Hz: Expecting Positive Number Input")
+        if not isinstance(priority, int):
+            raise Exception("Priority: Expecting Integer Input")
+        if not isinstance(primary, bool):
+            raise Exception("Primary: Expecting Bool Input")
+        entry = Executive.Entry(machine, rate_hz, priority, primary)
+        self.__entries.append(entry)
+        self.__entries.sort(key=lambda an_entry: -an_entry.priority)
+        return entry
+
+    def unregister(self, machine: any) -> None:
+        self.__entries = [entry for entry in self.__entries if entry.machine is not machine]
+
+    def stop(self) -> None:
+        self.__running = False
+
+    def run(self, time_budget: float = None) -> None:
+        if time_budget is not None:
+            if not isinstance(time_budget, float):
+                raise Exception("Time_Budget: Expecting Float Input")
+        start_time = Clock.current.now()
+        for entry in self.__entries:
+            entry.next_due = start_time
+        self.__running = True
+        while self.__running and self.__entries \
+                and (time_budget is None or Clock.current.now() - start_time < time_budget):
+            self.__run_due_entries()
+            if not self.__running:
+                break
+            next_due = min(entry.next_due for entry in self.__entries) if self.__entries else Clock.current.now()
+            if time_budget is not None and start_time + time_budget < next_due:
+                next_due = start_time + time_budget
+            FiniteStateMachine._wait_until(next_due)
+        self.__running = False
+
+    def __run_due_entries(self) -> None:
+        SensorSampleCache.advance_tick()
+        now = Clock.current.now()
+        finished = []
+        for index, entry in enumerate(self.__entries):
+            if now < entry.next_due:
+                continue
+            if now - entry.next_due < entry.period and self.__would_delay_higher(index, now, entry.mean_cost):
+                entry.deferral_count += 1
+                continue
+
+            track_state = entry.machine.track()
+            end = Clock.current.now()
+            entry._record_cost(end - now)
+            entry.next_due += entry.period
+            if entry.next_due < end:
+                entry.overrun_count += 1
+                entry.next_due = end
+            if track_state is False:
+                finished.append(entry)
+            now = end
+        for entry in finished:
+            self.__entries.remove(entry)
+            if entry.primary:
+                self.__running = False
+
+    def __would_delay_higher(self, index: int, now: float, cost: float) -> bool:
+        for higher in self.__entries[:index]:
+            if higher.priority > self.__entries[index].priority and higher.next_due - now < cost:
+                return True
+        return False
+
+    def report(self) -> str:
+        lines = []
+        for entry in self.__entries:
+            lines.append("{} | Priority: {} | Target: {:.1f} Hz | Ticks: {} | Deferred: {} | Overruns: {} | "
+                         "Cost: mean {:.1f} us, max {:.1f} us".format(type(entry.machine).__name__, entry.priority,
+                                                                      entry.rate_hz, entry.tick_count,
+                                                                      entry.deferral_count, entry.overrun_count,
+                                                                      entry.mean_cost * 1e6, entry.max_cost * 1e6))
+        return "\n".join(lines)
+
+
+# Fait avancer N copies d'un même layout gelé d'un seul coup. L'état de chaque copie (état courant, moment et
+# nombre d'entrées par état) vit dans des tableaux NumPy. Les StateEntryDurationCondition (et les
+# All/Any/NoneConditions et ExpressionCondition qui en contiennent) sont évaluées par copie avec des opérations
+# vectorielles. Les conditions sur des entrées externes (télécommande, télémètre, action terminée) et les
+# StateValueCondition sont évaluées une seule fois par groupe d'état, comme le verraient N machines lisant la même
+# entrée: sans actions, rien ne change custom_value d'une copie à l'autre.
+# Le layout est refusé s'il a des actions d'état ou de transition (jamais exécutées ici) ou des conditions dont
+# l'état propre ne peut pas être tenu par copie (TimedCondition, StateEntryCountCondition): le résultat
+# différerait de N machines scalaires.
+class BatchFiniteStateMachine:
+    def __init__(self, layout_parameter: 'FiniteStateMachine.Layout', instance_count: int) -> None:
+        try:
+            import numpy
+        except ImportError:
+            raise Exception("Numpy: Required By BatchFiniteStateMachine")
+        if not isinstance(layout_parameter, FiniteStateMachine.Layout):
+            raise Exception("Layout_Parameter: Expecting Layout Input")
+        if isinstance(instance_count, bool) or not isinstance(instance_count, int) or instance_count <= 0:
+            raise Exception("Instance_Count: Expecting Positive Integer Input")
+        if not layout_parameter.is_frozen:
+            layout_parameter.freeze()
+        for a_state in layout_parameter._frozen_states:
+            if BatchFiniteStateMachine.__has_actions(a_state):
+                raise Exception("Layout_Parameter: State Actions Are Not Supported By BatchFiniteStateMachine")
+        for row in layout_parameter._dispatch_table:
+            for condition, next_state_id, transition in row:
+                if BatchFiniteStateMachine.__has_actions(transition):
+                    raise Exception("Layout_Parameter: Transition Actions Are Not Supported By "
+                                    "BatchFiniteStateMachine")
+
+        self.__np = numpy
+        self.__layout = layout_parameter
+        state_count = len(layout_parameter._frozen_states)
+        self.__initial_id = layout_parameter.state_id(layout_parameter.initial_state)
+        self.__current = numpy.full(instance_count, self.__initial_id, dtype=numpy.int32)
+        self.__entry_times = numpy.zeros((instance_count, state_count), dtype=numpy.float64)
+        self.__entry_counts = numpy.zeros((instance_count, state_count), dtype=numpy.int64)
+        self.__terminal = numpy.zeros(instance_count, dtype=bool)
+        self.__terminal_flags = numpy.array(layout_parameter._terminal_flags, dtype=bool)
+        self.__uninitialized = True
+        self.__rows = [[(self.__compile_condition(condition, transition), next_state_id, transition)
+                        for condition, next_state_id, transition in row]
+                       for row in layout_parameter._dispatch_table]
+
+    @property
+    def instance_count(self) -> int:
+        return self.__current.shape[0]
+
+    @property
+    def current_state_ids(self) -> 'numpy.ndarray':
+        return self.__current.copy()
+
+    @property
+    def entry_times(self) -> 'numpy.ndarray':
+        return self.__entry_times.copy()
+
+    @property
+    def entry_counts(self) -> 'numpy.ndarray':
+        return self.__entry_counts.copy()
+
+    @property
+    def terminal_reached(self) -> 'numpy.ndarray':
+        return self.__terminal.copy()
+
+    def state_occupancy(self) -> 'numpy.ndarray':
+        return self.__np.bincount(self.__current, minlength=self.__entry_times.shape[1])
+
+    def transit_to(self, state: 'State', instances: 'numpy.ndarray' = None, now: float = None) -> None:
+        state_id = self.__layout.state_id(state)
+        if state_id is None:
+            raise Exception("State: Expecting A State Of The Frozen Layout")
+        if now is None:
+            now = Clock.current.now()
+        if instances is None:
+            instances = self.__np.arange(self.instance_count)
+        self.__uninitialized = False
+        self.__enter(instances, state_id, now)
+
+    def track(self, now: float = None) -> int:
+        np = self.__np
+        if now is None:
+            now = Clock.current.now()
+        if self.__uninitialized:
+            self.__uninitialized = False
+            self.__enter(np.arange(self.instance_count), self.__initial_id, now)
+
+        current = self.__current
+        next_current = current.copy()
+        for state_id, row in enumerate(self.__rows):
+            if not row:
+                continue
+            instances = np.nonzero((current == state_id) & ~self.__terminal)[0]
+            for evaluator, next_state_id, transition in row:
+                if instances.size == 0:
+                    break
+                fired = evaluator(instances, now)
+                if fired.any():
+                    if next_state_id < 0:
+                        next_state_id = self.__layout.state_id(transition.next_state)
+                        if next_state_id is None:
+                            raise Exception("Layout_Parameter: Remote Key Bound To A State Outside The Batch Layout")
+                    next_current[instances[fired]] = next_state_id
+                    self.__enter(instances[fired], next_state_id, now, next_current)
+                    instances = instances[~fired]
+        self.__current = next_current
+        return int(self.instance_count - np.count_nonzero(self.__terminal))
+
+    def __enter(self, instances: 'numpy.ndarray', state_id: int, now: float,
+                current: 'numpy.ndarray' = None) -> None:
+        (self.__current if current is None else current)[instances] = state_id
+        self.__entry_times[instances, state_id] = now
+        self.__entry_counts[instances, state_id] += 1
+        self.__terminal[instances] = self.__terminal_flags[state_id]
+
+    @staticmethod
+    def __has_actions(state_or_transition: 'State' or 'Transition') -> bool:
+        if isinstance(state_or_transition, State):
+            for name in ('_do_entering_action', '_do_in_state_action', '_do_exiting_action'):
+                if getattr(type(state_or_transition), name) not in (getattr(State, name), getattr(ActionState, name)):
+                    return True
+            return isinstance(state_or_transition, ActionState) and state_or_transition.has_actions
+        if type(state_or_transition)._do_transiting_action not in (Transition._do_transiting_action,
+                                                                   ActionTransition._do_transiting_action):
+            return True
+        return isinstance(state_or_transition, ActionTransition) and state_or_transition.has_actions
+
+    def __compile_condition(self, condition: 'Condition' or None, transition: 'Transition') -> Callable:
+        np = self.__np
+        if condition is None:
+            return lambda instances, now: np.full(instances.size, bool(transition.is_transiting()))
+        if isinstance(condition, (TimedCondition, StateEntryCountCondition)):
+            raise Exception("Layout_Parameter: {} Is Not Supported By BatchFiniteStateMachine"
+                            .format(type(condition).__name__))
+        if isinstance(condition, StateEntryDurationCondition):
+            monitored_id = self.__layout.state_id(condition.monitered_state)
+            if monitored_id is None:
+                raise Exception("Layout_Parameter: StateEntryDurationCondition Monitors A State Outside The Layout")
+            entry_times = self.__entry_times
+            if condition.inverse:
+                return lambda instances, now: now - entry_times[instances, monitored_id] < condition.duration
+            return lambda instances, now: now - entry_times[instances, monitored_id] >= condition.duration
+        if isinstance(condition, ExpressionCondition):
+            return self.__compile_node(condition.tree, transition)
+        if isinstance(condition, ManyConditions):
+            children = [self.__compile_condition(child, transition) for child in condition._conditions]
+            if isinstance(condition, AllConditions):
+                reduce, empty = np.logical_and, True
+            elif isinstance(condition, AnyConditions):
+                reduce, empty = np.logical_or, False
+            else:
+                reduce, empty = np.logical_and, True
+            negate = condition.inverse ^ isinstance(condition, NoneConditions)
+
+            def evaluate(instances: 'numpy.ndarray', now: float) -> 'numpy.ndarray':
+                result = np.full(instances.size, empty)
+                for child in children:
+                    result = reduce(result, child(instances, now))
+                return ~result if negate else result
+            return evaluate
+        return lambda instances, now: np.full(instances.size, bool(condition))
+
+    # Noeuds de ExpressionCondition.tree; chaque feuille est compilée comme une condition (avec son inverse)
+    def __compile_node(self, node: tuple, transition: 'Transition') -> Callable:
+        np = self.__np
+        kind = node[0]
+        if kind == 'leaf':
+            return self.__compile_condition(node[1], transition)
+        if kind == 'const':
+            value = node[1]
+            return lambda instances, now: np.full(instances.size, value)
+        if kind == 'not':
+            child = self.__compile_node(node[1], transition)
+            return lambda instances, now: ~child(instances, now)
+        children = [self.__compile_node(child, transition) for child in node[1]]
+        reduce = np.logical_and if kind == 'and' else np.logical_or
+
+        def evaluate(instances: 'numpy.ndarray', now: float) -> 'numpy.ndarray':
+            result = children[0](instances, now)
+            for child in children[1:]:
+                result = reduce(result, child(instances, now))
+            return result
+        return evaluate
+
+
+# Trace binaire des transitions dans un tampon circulaire préalloué (les plus anciennes sont écrasées).
+# Chaque enregistrement: moment (Clock.current), identifiant de la machine (ordre d'attache), états source et
+# destination et transition (identifiants du layout gelé, -1 si inconnu ou pour un transit_to()).
+# L'enregistrement n'écrit que dans des array: aucun objet n'est créé par transition.
+class TransitionRecorder:
+    MAGIC = b'FSMT'
+    HEADER = struct.Struct('<4sBxxxIIQ')
+
+    def __init__(self, capacity: int = 65536) -> None:
+        if isinstance(capacity, bool) or not isinstance(capacity, int) or capacity <= 0:
+            raise Exception("Capacity: Expecting Positive Integer Input")
+        self.__capacity = capacity
+        self.__timestamps = array('d', bytes(8 * capacity))
+        self.__machine_ids = array('i', bytes(4 * capacity))
+        self.__source_ids = array('i', bytes(4 * capacity))
+        self.__destination_ids = array('i', bytes(4 * capacity))
+        self.__transition_ids = array('i', bytes(4 * capacity))
+        self.__index = 0
+        self.__total = 0
+        self.__machines = []
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def total_recorded(self) -> int:
+        return self.__total
+
+    @property
+    def machines(self) -> list:
+        return list(self.__machines)
+
+    def __len__(self) -> int:
+        return min(self.__total, self.__capacity)
+
+    def attach(self, machine: 'FiniteStateMachine') -> int:
+        if not isinstance(machine, FiniteStateMachine):
+            raise Exception("Machine: Expecting FiniteStateMachine Input")
+        # une machine détachée puis rattachée garde son identifiant, mais doit être rebranchée
+        if machine in self.__machines:
+            machine_id = self.__machines.index(machine)
+        else:
+            self.__machines.append(machine)
+            machine_id = len(self.__machines) - 1
+        machine._set_recorder(self, machine_id)
+        return machine_id
+
+    def detach(self, machine: 'FiniteStateMachine') -> None:
+        if machine.recorder is self:
+            machine._set_recorder(None, -1)
+
+    def clear(self) -> None:
+        self.__index = 0
+        self.__total = 0
+
+    def _record(self, machine_id: int, source_id: int, destination_id: int, transition_id: int) -> None:
+        index = self.__index
+        self.__timestamps[index] = Clock.current.now()
+        self.__machine_ids[index] = machine_id
+        self.__source_ids[index] = -1 if source_id is None else source_id
+        self.__destination_ids[index] = destination_id
+        self.__transition_ids[index] = transition_id
+        index += 1
+        self.__index = 0 if index == self.__capacity else index
+        self.__total += 1
+
+    # Enregistrements en ordre chronologique: (moment, machine, source, destination, transition)
+    def records(self) -> list:
+        count = len(self)
+        first = (self.__index - count) % self.__capacity
+        indices = [(first + offset) % self.__capacity for offset in range(count)]
+        return [(self.__timestamps[i], self.__machine_ids[i], self.__source_ids[i],
+                 self.__destination_ids[i], self.__transition_ids[i]) for i in indices]
+
+    # En-tête puis les cinq colonnes en ordre chronologique, petit-boutiste: 24 octets par transition.
+    def dump(self, path: str) -> None:
+        if not isinstance(path, str):
+            raise Exception("Path: Expecting String Input")
+        count = len(self)
+        first = (self.__index - count) % self.__capacity
+        with open(path, 'wb') as file:
+            file.write(TransitionRecorder.HEADER.pack(TransitionRecorder.MAGIC, 1, self.__capacity, count,
+                                                      self.__total))
+            for column in (self.__timestamps, self.__machine_ids, self.__source_ids,
+                           self.__destination_ids, self.__transition_ids):
+                ordered = column[first:first + count]
+                if first + count > self.__capacity:
+                    ordered += column[:first + count - self.__capacity]
+                if sys.byteorder == 'big':
+                    ordered.byteswap()
+                ordered.tofile(file)
+
+    @staticmethod
+    def load(path: str) -> 'TransitionRecorder':
+        if not isinstance(path, str):
+            raise Exception("Path: Expecting String Input")
+        with open(path, 'rb') as file:
+            magic, version, capacity, count, total = TransitionRecorder.HEADER.unpack(
+                file.read(TransitionRecorder.HEADER.size))
+            if magic != TransitionRecorder.MAGIC or version != 1:
+                raise Exception("Path: Not A Transition Trace File")
+            recorder = TransitionRecorder(capacity)
+            for column in (recorder.__timestamps, recorder.__machine_ids, recorder.__source_ids,
+                           recorder.__destination_ids, recorder.__transition_ids):
+                loaded = array(column.typecode)
+                loaded.fromfile(file, count)
+                if sys.byteorder == 'big':
+                    loaded.byteswap()
+                column[:count] = loaded
+        recorder.__index = count % capacity
+        recorder.__total = total
+        return recorder
+
+
+# Profilage par condition. enable() remplace __bool__ au niveau des classes (Condition et les sous-classes qui
+# le redéfinissent) et disable() remet les originaux: désactivé, il ne coûte rien. Les temps sont inclusifs
+# (une All/AnyConditions compte aussi le temps de ses enfants). Une RemoteDispatchTransition est gelée sans
+# condition (sa RemoteKeyCondition n'est jamais évaluée): son is_transiting() est donc aussi remplacé et compté
+# sous sa condition. attach(machine) gèle le layout au besoin et associe chaque condition de tous les états
+# atteignables (et des régions des états hiérarchiques) à sa transition, désignée par les identifiants du layout
+# gelé: "<machine> <état source> -> <état destination> #<transition> (<type>)". Les sous-graphes construits
+# plus tard (Blinker) demandent de rappeler attach().
+class ConditionProfiler:
+    class Record:
+        def __init__(self, condition: 'Condition') -> None:
+            self.condition = condition
+            self.owner = None
+            self.evaluation_count = 0
+            self.true_count = 0
+            self.total_time = 0.0
+            self.max_time = 0.0
+
+        @property
+        def mean_time(self) -> float:
+            return self.total_time / self.evaluation_count if self.evaluation_count else 0.0
+
+        def __str__(self) -> str:
+            return "{} | Owner: {} | Evaluations: {} | True: {} | Time: total {:.1f} us, mean {:.2f} us, " \
+                   "max {:.1f} us".format(type(self.condition).__name__, self.owner or "?", self.evaluation_count,
+                                          self.true_count, self.total_time * 1e6, self.mean_time * 1e6,
+                                          self.max_time * 1e6)
+
+    _active = None
+
+    def __init__(self) -> None:
+        self.__records = {}
+        self.__originals = {}
+
+    @property
+    def is_enabled(self) -> bool:
+        return ConditionProfiler._active is self
+
+    def enable(self) -> None:
+        if ConditionProfiler._active is self:
+            return
+        if ConditionProfiler._active is not None:
+            raise Exception("ConditionProfiler: Another Profiler Is Already Enabled")
+        pending = [Condition]
+        while pending:
+            condition_class = pending.pop()
+            pending.extend(condition_class.__subclasses__())
+            if '__bool__' in condition_class.__dict__:
+                original = condition_class.__dict__['__bool__']
+                self.__originals[(condition_class, '__bool__')] = original
+                condition_class.__bool__ = self.__profiled(original)
+        original = RemoteDispatchTransition.__dict__['is_transiting']
+        self.__originals[(RemoteDispatchTransition, 'is_transiting')] = original
+        RemoteDispatchTransition.is_transiting = self.__profiled(original, lambda transition: transition.condition)
+        ConditionProfiler._active = self
+
+    def disable(self) -> None:
+        if ConditionProfiler._active is not self:
+            return
+        for (profiled_class, name), original in self.__originals.items():
+            setattr(profiled_class, name, original)
+        self.__originals = {}
+        ConditionProfiler._active = None
+
+    # subject: objet évalué -> condition sous laquelle compter (None: l'objet lui-même)
+    def __profiled(self, original: Callable, subject: Callable = None) -> Callable:
+        records = self.__records
+
+        def profiled_bool(evaluated: any) -> bool:
+            start = perf_counter()
+            value = original(evaluated)
+            elapsed = perf_counter() - start
+            condition = evaluated if subject is None else subject(evaluated)
+            record = records.get(id(condition))
+            if record is None:
+                record = ConditionProfiler.Record(condition)
+                records[id(condition)] = record
+            record.evaluation_count += 1
+            if value:
+                record.true_count += 1
+            record.total_time += elapsed
+            if elapsed > record.max_time:
+                record.max_time = elapsed
+            return value
+        return profiled_bool
+
+    # name: préfixe des propriétaires (nom de la classe de la machine par défaut); les régions des états
+    # hiérarchiques sont nommées "<nom>.<identifiant de l'état>", les côtés d'un SideBlinkers "<nom>.left/right".
+    def attach(self, machine: 'FiniteStateMachine' or 'SideBlinkers', name: str = None) -> None:
+        if name is not None and not isinstance(name, str):
+            raise Exception("Name: Expecting String Input")
+        if name is None:
+            name = type(machine).__name__
+        if isinstance(machine, SideBlinkers):
+            self.attach(machine.left_blinker, name + ".left")
+            self.attach(machine.right_blinker, name + ".right")
+            return
+        if not isinstance(machine, FiniteStateMachine):
+            raise Exception("Machine: Expecting FiniteStateMachine Or SideBlinkers Input")
+        layouts = [(name, machine.layout)]
+        visited = set()
+        while layouts:
+            prefix, layout = layouts.pop()
+            if layout in visited:
+                continue
+            visited.add(layout)
+            if not layout.is_frozen:
+                layout.freeze()
+            for state_id, a_state in enumerate(layout._frozen_states):
+                if isinstance(a_state, CompositeState) and a_state.region is not None:
+                    layouts.append(("{}.{}".format(prefix, state_id), a_state.region.layout))
+                for transition in a_state.get_transitionList:
+                    if isinstance(transition, ConditionalTransition):
+                        if isinstance(transition, RemoteDispatchTransition):
+                            destination = "key"
+                        else:
+                            destination = layout.state_id(transition.next_state)
+                        owner = "{} {} -> {} #{} ({})".format(prefix, state_id, destination,
+                                                             layout.transition_id(transition),
+                                                             type(transition).__name__)
+                        self.__own(transition.condition, owner)
+
+    def __own(self, condition: 'Condition', owner: str) -> None:
+        record = self.__records.get(id(condition))
+        if record is None:
+            record = ConditionProfiler.Record(condition)
+            self.__records[id(condition)] = record
+        record.owner = owner
+        if isinstance(condition, ManyConditions):
+            for child in condition._conditions:
+                self.__own(child, owner)
+        elif isinstance(condition, ExpressionCondition):
+            pending = [condition.tree]
+            while pending:
+                node = pending.pop()
+                if node[0] == 'leaf':
+                    self.__own(node[1], owner)
+                elif node[0] == 'not':
+                    pending.append(node[1])
+                elif node[0] in ('and', 'or'):
+                    pending.extend(node[1])
+
+    def clear(self) -> None:
+        for record in self.__records.values():
+            record.evaluation_count = 0
+            record.true_count = 0
+            record.total_time = 0.0
+            record.max_time = 0.0
+
+    # Par temps total décroissant
+    def records(self) -> list:
+        return sorted(self.__records.values(), key=lambda record: record.total_time, reverse=True)
+
+    def report(self, limit: int = None) -> str:
+        records = [record for record in self.records() if record.evaluation_count > 0]
+        if limit is not None:
+            records = records[:limit]
+        return "\n".join(str(record) for record in records)
+
+
+# Export des métriques au format texte Prometheus. Le registre ne garde que des références: render() lit les
+# compteurs et histogrammes déjà agrégés par les machines, états et transitions surveillés. serve() et
+# write_periodically() appellent render() dans un fil démon, jamais dans le fil des ticks.
+class MetricsRegistry:
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self) -> None:
+        self.__machines = []
+        self.__robots = []
+        self.__server = None
+        self.__writer = None
+        self.__stop_writer = threading.Event()
+
+    # Les régions des états hiérarchiques sont ajoutées sous le nom "<nom>.<identifiant de l'état>".
+    def register_machine(self, name: str, machine: 'FiniteStateMachine') -> None:
+        if not isinstance(name, str):
+            raise Exception("Name: Expecting String Input")
+        if not isinstance(machine, FiniteStateMachine):
+            raise Exception("Machine: Expecting FiniteStateMachine Input")
+        self.__machines.append((name, machine))
+        machine.layout.enable_histograms()
+        for index, a_state in enumerate(MetricsRegistry.__states_of(machine.layout)):
+            if isinstance(a_state, CompositeState) and a_state.region is not None:
+                self.register_machine("{}.{}".format(name, index), a_state.region)
+
+    # Clignotants du robot comme machines, et lectures matérielles des capteurs de ce robot (Robot.sensors)
+    # comptées par leurs SensorSampleCache
+    def register_robot(self, name: str, robot: 'Robot') -> None:
+        if not isinstance(name, str):
+            raise Exception("Name: Expecting String Input")
+        if not isinstance(robot, Robot):
+            raise Exception("Robot: Expecting Robot Input")
+        self.__robots.append((name, robot))
+        for blinkers_name, blinkers in (("eye", robot.eye_blinkers), ("led", robot.led_blinkers)):
+            self.register_machine("{}.{}_left".format(name, blinkers_name), blinkers.left_blinker)
+            self.register_machine("{}.{}_right".format(name, blinkers_name), blinkers.right_blinker)
+
+    @staticmethod
+    def __states_of(layout: 'FiniteStateMachine.Layout') -> tuple:
+        return layout._frozen_states if layout._frozen_states else tuple(layout.states)
+
+    @staticmethod
+    def __labels(**labels) -> str:
+        return "{" + ",".join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                              for key, value in labels.items()) + "}"
+
+    @staticmethod
+    def __summary(lines: list, metric: str, histogram: 'LogHistogram' or None, labels: dict) -> None:
+        if histogram is None:
+            return
+        for quantile in MetricsRegistry.QUANTILES:
+            lines.append("{}{} {!r}".format(metric, MetricsRegistry.__labels(**labels, quantile=quantile),
+                                            histogram.percentile(quantile * 100.0)))
+        lines.append("{}_sum{} {!r}".format(metric, MetricsRegistry.__labels(**labels), histogram.total))
+        lines.append("{}_count{} {}".format(metric, MetricsRegistry.__labels(**labels), histogram.count))
+
+    def render(self) -> str:
+        families = {
+            "fsm_ticks_total": ("counter", []),
+            "fsm_operational_state": ("gauge", []),
+            "fsm_state_entries_total": ("counter", []),
+            "fsm_state_dwell_seconds": ("summary", []),
+            "fsm_state_in_state_cost_seconds": ("summary", []),
+            "fsm_transition_transits_total": ("counter", []),
+            "fsm_transition_interval_seconds": ("summary", []),
+            "fsm_transition_action_seconds": ("summary", []),
+            "robot_sensor_reads_total": ("counter", []),
+        }
+        for name, machine in self.__machines:
+            families["fsm_ticks_total"][1].append("fsm_ticks_total{} {}".format(
+                MetricsRegistry.__labels(machine=name), machine.tick_count))
+            for operational_state in FiniteStateMachine.OperationalState:
+                families["fsm_operational_state"][1].append("fsm_operational_state{} {}".format(
+                    MetricsRegistry.__labels(machine=name, state=operational_state.name),
+                    1 if machine.current_operational_state == operational_state else 0))
+            states = MetricsRegistry.__states_of(machine.layout)
+            state_labels = {a_state: "{}:{}".format(index, type(a_state).__name__)
+                            for index, a_state in enumerate(states)}
+            for a_state in states:
+                labels = {"machine": name, "state": state_labels[a_state]}
+                if isinstance(a_state, MonitoredState):
+                    families["fsm_state_entries_total"][1].append("fsm_state_entries_total{} {}".format(
+                        MetricsRegistry.__labels(**labels), a_state.entry_count))
+                    MetricsRegistry.__summary(families["fsm_state_dwell_seconds"][1], "fsm_state_dwell_seconds",
+                                              a_state.dwell_histogram, labels)
+                    MetricsRegistry.__summary(families["fsm_state_in_state_cost_seconds"][1],
+                                              "fsm_state_in_state_cost_seconds", a_state.in_state_cost_histogram,
+                                              labels)
+                for index, transition in enumerate(a_state.get_transitionList):
+                    if not isinstance(transition, MonitoredTransition):
+                        continue
+                    labels = {"machine": name, "transition": "{}#{}->{}".format(
+                        state_labels[a_state], index, state_labels.get(transition.next_state, "?"))}
+                    families["fsm_transition_transits_total"][1].append("fsm_transition_transits_total{} {}".format(
+                        MetricsRegistry.__labels(**labels), transition.transit_count))
+                    MetricsRegistry.__summary(families["fsm_transition_interval_seconds"][1],
+                                              "fsm_transition_interval_seconds", transition.interval_histogram, labels)
+                    MetricsRegistry.__summary(families["fsm_transition_action_seconds"][1],
+                                              "fsm_transition_action_seconds", transition.action_time_histogram,
+                                              labels)
+        for name, robot in self.__robots:
+            for sensor_name, sensor in robot.sensors.items():
+                for method_name, cache in sorted(SensorSampleCache.caches_of(sensor).items()):
+                    families["robot_sensor_reads_total"][1].append("robot_sensor_reads_total{} {}".format(
+                        MetricsRegistry.__labels(robot=name, sensor=sensor_name, method=method_name),
+                        cache.read_count))
+
+        lines = []
+        for metric, (metric_type, samples) in families.items():
+            if samples:
+                lines.append("# TYPE {} {}".format(metric, metric_type))
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    # Point d'accès HTTP local (GET /metrics), dans un fil démon
+    def serve(self, port: int = 9100, host: str = "127.0.0.1") -> None:
+        if isinstance(port, bool) or not isinstance(port, int):
+            raise Exception("Port: Expecting Integer Input")
+        if self.__server is not None:
+            raise Exception("MetricsRegistry: Already Serving")
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.__server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, name="fsm-metrics-http", daemon=True).start()
+
+    @property
+    def server_address(self) -> tuple or None:
+        return self.__server.server_address if self.__server is not None else None
+
+    # Écrit un instantané toutes les interval secondes; l'instantané précédent devient path.1, puis path.2...
+    def write_periodically(self, path: str, interval: float = 10.0, backups: int = 3) -> None:
+        if not isinstance(path, str):
+            raise Exception("Path: Expecting String Input")
+        if not isinstance(interval, float) or interval <= 0:
+            raise Exception("Interval: Expecting Positive Float Input")
+        if isinstance(backups, bool) or not isinstance(backups, int) or backups < 0:
+            raise Exception("Backups: Expecting Positive Integer Input")
+        if self.__writer is not None:
+            raise Exception("MetricsRegistry: Already Writing")
+        self.__stop_writer.clear()
+
+        def write_loop() -> None:
+            while True:
+                self.write(path, backups)
+                if self.__stop_writer.wait(interval):
+                    return
+
+        self.__writer = threading.Thread(target=write_loop, name="fsm-metrics-file", daemon=True)
+        self.__writer.start()
+
+    def write(self, path: str, backups: int = 3) -> None:
+        if os.path.exists(path):
+            for index in range(backups - 1, 0, -1):
+                if os.path.exists("{}.{}".format(path, index)):
+                    os.replace("{}.{}".format(path, index), "{}.{}".format(path, index + 1))
+            if backups > 0:
+                os.replace(path, "{}.1".format(path))
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as file:
+            file.write(self.render())
+        os.replace(temporary_path, path)
+
+    def stop(self) -> None:
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+        if self.__writer is not None:
+            self.__stop_writer.set()
+            self.__writer.join()
+            self.__writer = None
+
+
 ##     ## #### ##     ## #########    ###    ##     ##          #######
 ###    ##  ##  ##     ## ##          ## ##   ##     ##         ##     ##
 ####   ##  ##  ##     ## ##         ##   ##  ##     ##                ##
@@ -455,6 +1894,8 @@ class FiniteStateMachine:
 
 
 class ConditionalTransition(Transition):
+    __slots__ = ('__condition',)
+
     def __init__(self, condition: 'Condition' = None, next_state: 'State' = None):
         super().__init__(next_state)
         if isinstance(condition, Condition):
@@ -497,6 +1938,8 @@ class ConditionalTransition(Transition):
 
 
 class RemoteControlTransition(ConditionalTransition):
+    __slots__ = ('_remote_control',)
+
     def __init__(self, condition: 'Condition' = None, next_state: 'RobotState' = None,
                  remote_control: 'RemoteControl' = None):
         if isinstance(condition, Condition):
@@ -527,6 +1970,13 @@ class RemoteControlTransition(ConditionalTransition):
 
 
 class Condition:
+    __slots__ = ('__inverse',)
+
+    # Incrémenté à chaque changement qui peut déplacer l'échéance d'une condition temporisée (durée, référence,
+    # entrée dans un état surveillé, changement d'horloge): invalide les échéances mises en cache par
+    # FiniteStateMachine.
+    _timing_generation = 0
+
     def __init__(self, inverse: bool = False):
         if not isinstance(inverse, bool):
             raise Exception("Inverse: Expecting Bool Input")
@@ -536,10 +1986,39 @@ class Condition:
     def _compare(self) -> bool:
         pass
 
+    @property
+    def inverse(self) -> bool:
+        return self.__inverse
+
     # https://docs.python.org/3/reference/datamodel.html?highlight=__bool__#object.__bool__
     def __bool__(self) -> bool:
         return self._compare() ^ self.__inverse
 
+    # a & b | ~c: voir ExpressionCondition
+    def __and__(self, other: 'Condition') -> 'ExpressionCondition':
+        if not isinstance(other, Condition):
+            return NotImplemented
+        return ExpressionCondition('and', [self, other])
+
+    def __or__(self, other: 'Condition') -> 'ExpressionCondition':
+        if not isinstance(other, Condition):
+            return NotImplemented
+        return ExpressionCondition('or', [self, other])
+
+    def __invert__(self) -> 'ExpressionCondition':
+        return ExpressionCondition('not', [self])
+
+    # Voir State.next_deadline. Une condition inversée devient vraie quand sa comparaison devient fausse:
+    # on ne peut rien prédire, il faut la vérifier à chaque tick.
+    @property
+    def next_deadline(self) -> float or None:
+        if self.__inverse:
+            return None
+        return self._next_deadline()
+
+    def _next_deadline(self) -> float or None:
+        return None
+
 
 """
            ______________________________________
@@ -552,6 +2031,8 @@ class Condition:
 
 
 class AlwaysTrueCondition(Condition):
+    __slots__ = ()
+
     def __init__(self, inverse: bool = False):
         if not isinstance(inverse, bool):
             raise Exception("Inverse: Expecting Bool Input")
@@ -572,6 +2053,8 @@ class AlwaysTrueCondition(Condition):
 
 
 class ValueCondition(Condition):
+    __slots__ = ('value', 'expected_value')
+
     def __init__(self, initial_value: any, expected_value: any, inverse: bool = False):
         if initial_value is None:
             raise Exception("Initial_Value: Expecting Value Not None")
@@ -586,6 +2069,9 @@ class ValueCondition(Condition):
     def _compare(self) -> bool:
         return True if self.value == self.expected_value else False
 
+    def _next_deadline(self) -> float or None:
+        return math.inf
+
 
 """
            ______________________________________
@@ -598,6 +2084,8 @@ class ValueCondition(Condition):
 
 
 class TimedCondition(Condition):
+    __slots__ = ('__counter_duration', '__counter_reference')
+
     def __init__(self, duration: float = 1.0, time_reference: float = None, inverse: bool = False):
         if not isinstance(duration, float):
             raise Exception("Duration: Expecting Float Input")
@@ -609,12 +2097,15 @@ class TimedCondition(Condition):
         super().__init__(inverse)
         self.__counter_duration: float = duration
         if time_reference is None:
-            self.__counter_reference = time.perf_counter()
+            self.__counter_reference = Clock.current.now()
         else:
             self.__counter_reference = time_reference
 
     def _compare(self) -> bool:
-        return time.perf_counter() - self.__counter_reference >= self.__counter_duration
+        return Clock.current.now() - self.__counter_reference >= self.__counter_duration
+
+    def _next_deadline(self) -> float or None:
+        return self.__counter_reference + self.__counter_duration
 
     @property
     def duration(self) -> float:
@@ -625,11 +2116,13 @@ class TimedCondition(Condition):
         self.__counter_duration = new_duration
         if isinstance(new_duration, float):
             self.__counter_duration = new_duration
+            Condition._timing_generation += 1
         else:
             raise Exception("New_Duration: Expecting Float Input")
 
     def reset(self):
-        self.__counter_reference = time.perf_counter()
+        self.__counter_reference = Clock.current.now()
+        Condition._timing_generation += 1
 
 
 """
@@ -644,17 +2137,51 @@ class TimedCondition(Condition):
 
 
 class ManyConditions(Condition):
+    __slots__ = ('_conditions', '__adaptive', '__statistics', '__evaluation_count', '__skipped_count',
+                 '__saved_cost')
 
-    def __init__(self, inverse: bool = False):
+    class ChildStatistics:
+        def __init__(self, condition: 'Condition') -> None:
+            self.condition = condition
+            self.evaluation_count = 0
+            self.true_count = 0
+            self.mean_cost = 0.0
+
+        @property
+        def true_rate(self) -> float:
+            return self.true_count / self.evaluation_count if self.evaluation_count else 0.5
+
+        def _record(self, value: bool, cost: float) -> None:
+            if self.evaluation_count == 0:
+                self.mean_cost = cost
+            else:
+                self.mean_cost += (cost - self.mean_cost) * 0.1
+            self.evaluation_count += 1
+            if value:
+                self.true_count += 1
+
+    REORDER_INTERVAL = 64
+
+    # adaptive: chaque enfant est chronométré et son taux de vrai est compté; l'ordre d'évaluation est revu
+    # tous les REORDER_INTERVAL appels pour que les enfants peu coûteux et décisifs court-circuitent les autres.
+    def __init__(self, inverse: bool = False, adaptive: bool = False):
         if not isinstance(inverse, bool):
             raise Exception("Inverse: Expecting Bool Input")
+        if not isinstance(adaptive, bool):
+            raise Exception("Adaptive: Expecting Bool Input")
         super().__init__(inverse)
         self._conditions: list[Condition] = []
+        self.__adaptive = adaptive
+        self.__statistics: list[ManyConditions.ChildStatistics] = []
+        self.__evaluation_count = 0
+        self.__skipped_count = 0
+        self.__saved_cost = 0.0
 
     def add_condition(self, condition: 'Condition'):
         if not isinstance(condition, Condition):
             raise Exception("Condition: Expecting Condition Input")
         self._conditions.append(condition)
+        self.__statistics.append(ManyConditions.ChildStatistics(condition))
 
     def add_conditions(self, condition_list: ConditionList):
         if not isinstance(condition_list, list):
@@ -663,6 +2190,69 @@ class ManyConditions(Condition):
             if not isinstance(condition, Condition):
                 raise Exception("Error: At Least One Element Of Condition_List Is Not A Condition")
         self._conditions.extend(condition_list)
+        self.__statistics.extend(ManyConditions.ChildStatistics(condition) for condition in condition_list)
+
+    @property
+    def adaptive(self) -> bool:
+        return self.__adaptive
+
+    @property
+    def evaluation_order(self) -> list:
+        return [child.condition for child in self.__statistics]
+
+    @property
+    def child_statistics(self) -> list:
+        return list(self.__statistics)
+
+    # Temps estimé (secondes) évité par le court-circuit: somme des coûts moyens des enfants non évalués.
+    @property
+    def saved_cost(self) -> float:
+        return self.__saved_cost
+
+    # Vrai dès qu'un enfant vaut stop_value, en suivant l'ordre adaptatif.
+    def _short_circuit(self, stop_value: bool) -> bool:
+        statistics = self.__statistics
+        found = False
+        for index, child in enumerate(statistics):
+            start = perf_counter()
+            value = bool(child.condition)
+            child._record(value, perf_counter() - start)
+            if value is stop_value:
+                for skipped in statistics[index + 1:]:
+                    self.__saved_cost += skipped.mean_cost
+                self.__skipped_count += len(statistics) - index - 1
+                found = True
+                break
+        self.__evaluation_count += 1
+        if self.__evaluation_count % ManyConditions.REORDER_INTERVAL == 0:
+            self.__reorder(stop_value)
+        return found
+
+    # Coût attendu par court-circuit obtenu: coût moyen / probabilité que l'enfant arrête l'évaluation.
+    def __reorder(self, stop_value: bool) -> None:
+        def rank(child: 'ManyConditions.ChildStatistics') -> float:
+            stop_rate = child.true_rate if stop_value else 1.0 - child.true_rate
+            return child.mean_cost / max(stop_rate, 0.001)
+        self.__statistics.sort(key=rank)
+
+    def ordering_report(self) -> str:
+        lines = []
+        for index, child in enumerate(self.__statistics):
+            lines.append("{} | {} | Evaluations: {} | True: {:.1f} % | Cost: mean {:.1f} us".format(
+                index, type(child.condition).__name__, child.evaluation_count, child.true_rate * 100.0,
+                child.mean_cost * 1e6))
+        lines.append("Evaluations: {} | Skipped children: {} | Saved: {:.1f} us".format(
+            self.__evaluation_count, self.__skipped_count, self.__saved_cost * 1e6))
+        return "\n".join(lines)
+
+    def _child_deadlines(self) -> list or None:
+        deadlines = []
+        for condition in self._conditions:
+            deadline = condition.next_deadline
+            if deadline is None:
+                return None
+            deadlines.append(deadline)
+        return deadlines
 
 
 """
@@ -677,14 +2267,24 @@ class ManyConditions(Condition):
 
 
 class AllConditions(ManyConditions):
-    def __init__(self, inverse: bool = False):
+    __slots__ = ()
+
+    def __init__(self, inverse: bool = False, adaptive: bool = False):
         if not isinstance(inverse, bool):
             raise Exception("Inverse: Expecting Bool Input")
-        super().__init__(inverse)
+        super().__init__(inverse, adaptive)
 
     def _compare(self) -> bool:
+        if self.adaptive:
+            return not self._short_circuit(False)
         return all(self._conditions)
 
+    def _next_deadline(self) -> float or None:
+        deadlines = self._child_deadlines()
+        if deadlines is None:
+            return None
+        return max(deadlines, default=-math.inf)
+
 
 """
            ______________________________________
@@ -698,14 +2298,24 @@ class AllConditions(ManyConditions):
 
 
 class AnyConditions(ManyConditions):
-    def __init__(self, inverse: bool = False):
+    __slots__ = ()
+
+    def __init__(self, inverse: bool = False, adaptive: bool = False):
         if not isinstance(inverse, bool):
             raise Exception("Inverse: Expecting Bool Input")
-        super().__init__(inverse)
+        super().__init__(inverse, adaptive)
 
     def _compare(self) -> bool:
+        if self.adaptive:
+            return self._short_circuit(True)
         return any(self._conditions)
 
+    def _next_deadline(self) -> float or None:
+        deadlines = self._child_deadlines()
+        if deadlines is None:
+            return None
+        return min(deadlines, default=math.inf)
+
 
 """
            ______________________________________
@@ -719,15 +2329,154 @@ class AnyConditions(ManyConditions):
 
 
 class NoneConditions(ManyConditions):
-    def __init__(self, inverse: bool = False):
+    __slots__ = ()
+
+    def __init__(self, inverse: bool = False, adaptive: bool = False):
         if not isinstance(inverse, bool):
             raise Exception("Inverse: Expecting Bool Input")
-        super().__init__(inverse)
+        super().__init__(inverse, adaptive)
 
     def _compare(self) -> bool:
+        if self.adaptive:
+            return self._short_circuit(False)
         return not all(self._conditions)
 
 
+"""
+           ______________________________________
+  ________|                                      |_______
+  \       |         EXPRESSIONCONDITION          |      /
+   \      |                                      |     /
+   /      |______________________________________|     \ 
+  /__________)                                (_________\ 
+
+"""
+
+
+# Construite par les opérateurs &, | et ~ des conditions. L'arbre est aplati (a & b & c est un seul et), les
+# AlwaysTrueCondition sont remplacées par des constantes puis simplifiées, les doubles négations disparaissent.
+# Il est ensuite compilé en un arbre de fermetures; chaque feuille est évaluée par sa propre vérité, donc avec son
+# inverse.
+# Noeuds: ('leaf', condition), ('const', bool), ('not', noeud), ('and', noeuds), ('or', noeuds)
+class ExpressionCondition(Condition):
+    __slots__ = ('__tree', '__evaluate')
+
+    def __init__(self, operator: str, operands: ConditionList):
+        if operator not in ('and', 'or', 'not'):
+            raise Exception("Operator: Expecting 'and', 'or' Or 'not' Input")
+        if not isinstance(operands, list):
+            raise Exception("Operands: Expecting List Input")
+        for operand in operands:
+            if not isinstance(operand, Condition):
+                raise Exception("Error: At Least One Element Of Operands Is Not A Condition")
+        if operator == 'not' and len(operands) != 1:
+            raise Exception("Operands: Expecting A Single Operand For 'not'")
+
+        super().__init__(False)
+        self.__tree = ExpressionCondition.__fold(operator, [ExpressionCondition.__node(operand)
+                                                             for operand in operands])
+        self.__evaluate = ExpressionCondition.__compile(self.__tree)
+
+    @property
+    def tree(self) -> tuple:
+        return self.__tree
+
+    def _compare(self) -> bool:
+        return self.__evaluate()
+
+    def __bool__(self) -> bool:
+        return self.__evaluate()
+
+    def _next_deadline(self) -> float or None:
+        return ExpressionCondition.__deadline(self.__tree)
+
+    @staticmethod
+    def __node(condition: 'Condition') -> tuple:
+        if isinstance(condition, ExpressionCondition):
+            return condition.__tree
+        if isinstance(condition, AlwaysTrueCondition):
+            return 'const', not condition.inverse
+        return 'leaf', condition
+
+    @staticmethod
+    def __fold(operator: str, nodes: list) -> tuple:
+        if operator == 'not':
+            node = nodes[0]
+            if node[0] == 'not':
+                return node[1]
+            if node[0] == 'const':
+                return 'const', not node[1]
+            return 'not', node
+
+        # valeur qui décide seule du résultat: False pour un et, True pour un ou
+        deciding = operator == 'or'
+        children = []
+        for node in nodes:
+            if node[0] == operator:
+                children.extend(node[1])
+            elif node[0] == 'const':
+                if node[1] == deciding:
+                    return 'const', deciding
+            else:
+                children.append(node)
+        if not children:
+            return 'const', not deciding
+        if len(children) == 1:
+            return children[0]
+        return operator, tuple(children)
+
+    # Comme All/AnyConditions: un et devient vrai au plus tard de ses enfants, un ou au plus tôt.
+    @staticmethod
+    def __deadline(node: tuple) -> float or None:
+        kind = node[0]
+        if kind == 'leaf':
+            return node[1].next_deadline
+        if kind == 'const':
+            return -math.inf if node[1] else math.inf
+        if kind == 'not':
+            return None
+        deadlines = []
+        for child in node[1]:
+            deadline = ExpressionCondition.__deadline(child)
+            if deadline is None:
+                return None
+            deadlines.append(deadline)
+        return max(deadlines) if kind == 'and' else min(deadlines)
+
+    # Une fermeture par noeud: une feuille est la vérité de sa condition, un et/ou s'arrête au premier enfant
+    # qui décide (les paires, le cas le plus courant, sont spécialisées).
+    @staticmethod
+    def __compile(node: tuple) -> Callable:
+        kind = node[0]
+        if kind == 'const':
+            value = node[1]
+            return lambda: value
+        if kind == 'leaf':
+            return node[1].__bool__
+        if kind == 'not':
+            child = ExpressionCondition.__compile(node[1])
+            return lambda: not child()
+        children = tuple(ExpressionCondition.__compile(child) for child in node[1])
+        if len(children) == 2:
+            first, second = children
+            if kind == 'and':
+                return lambda: first() and second()
+            return lambda: first() or second()
+        if kind == 'and':
+            def evaluate() -> bool:
+                for child in children:
+                    if not child():
+                        return False
+                return True
+        else:
+            def evaluate() -> bool:
+                for child in children:
+                    if child():
+                        return True
+                return False
+        return evaluate
+
+
 """
            ______________________________________
   ________|                                      |_______
@@ -740,6 +2489,8 @@ class NoneConditions(ManyConditions):
 
 
 class MonitoredStateCondition(Condition):
+    __slots__ = ('_monitered_state',)
+
     def __init__(self, monitered_state: 'MonitoredState', inverse: bool = False):
         if isinstance(monitered_state, MonitoredState):
             super().__init__(inverse)
@@ -757,6 +2508,7 @@ class MonitoredStateCondition(Condition):
     def monitered_state(self, next_monitered_state: 'MonitoredState'):
         if isinstance(next_monitered_state, MonitoredState):
             self._monitered_state = next_monitered_state
+            Condition._timing_generation += 1
         else:
             raise Exception("Monitored_State: Expecting MonitoredState Input")
 
@@ -773,6 +2525,8 @@ class MonitoredStateCondition(Condition):
 
 
 class StateEntryDurationCondition(MonitoredStateCondition):
+    __slots__ = ('__duration',)
+
     def __init__(self, duration: float, monitered_state: 'MonitoredState', inverse: bool = False):
         if not isinstance(monitered_state, MonitoredState):
             raise Exception("Monitored_State: Expecting MonitoredState Input")
@@ -785,7 +2539,10 @@ class StateEntryDurationCondition(MonitoredStateCondition):
         self.__duration = duration
 
     def _compare(self) -> bool:
-        return time.perf_counter() - self._monitered_state.last_entry_time >= self.__duration
+        return Clock.current.now() - self._monitered_state.last_entry_time >= self.__duration
+
+    def _next_deadline(self) -> float or None:
+        return self._monitered_state.last_entry_time + self.__duration
 
     @property
     def duration(self) -> float:
@@ -795,6 +2552,7 @@ class StateEntryDurationCondition(MonitoredStateCondition):
     def duration(self, new_duration):
         if isinstance(new_duration, float):
             self.__duration = new_duration
+            Condition._timing_generation += 1
         else:
             raise Exception("New_Duration: Expecting Float Input")
 
@@ -811,6 +2569,8 @@ class StateEntryDurationCondition(MonitoredStateCondition):
 
 
 class StateEntryCountCondition(MonitoredStateCondition):
+    __slots__ = ('__expected_count', '__ref_count', '__auto_reset')
+
     def __init__(self, expected_count: int, monitered_state: 'MonitoredState', auto_reset: bool = False,
                  inverse: bool = False):
         if not isinstance(monitered_state, MonitoredState):
@@ -864,6 +2624,8 @@ class StateEntryCountCondition(MonitoredStateCondition):
 
 
 class StateValueCondition(MonitoredStateCondition):
+    __slots__ = ('__expected_value',)
+
     def __init__(self, expected_value: any, monitered_state: 'MonitoredState', inverse: bool = False):
         if not isinstance(monitered_state, MonitoredState):
             raise Exception("Monitored_State: Expecting MonitoredState Input")
@@ -880,6 +2642,9 @@ class StateValueCondition(MonitoredStateCondition):
     def _compare(self)->bool:
         return self._monitered_state.custom_value == self.expected_value
 
+    def _next_deadline(self) -> float or None:
+        return math.inf
+
     @property
     def expected_value(self) -> any:
         return self.__expected_value
@@ -892,6 +2657,100 @@ class StateValueCondition(MonitoredStateCondition):
         self.__expected_value = new_expected_value
 
 
+"""
+           ______________________________________
+  ________|                                      |_______
+  \       |          SensorSampleCache           |      /
+   \      |                                      |     /
+   /      |______________________________________|     \ 
+  /__________)                                (_________\ 
+
+"""
+
+
+# Une lecture matérielle (I2C, IR) par tick et par capteur, partagée par toutes les conditions qui lisent ce
+# capteur. Le numéro de tick est avancé par les boucles run(), run_async() et Executive.run(); une boucle
+# maison qui appelle track() directement doit appeler SensorSampleCache.advance_tick(). L'âge maximal borne la
+# durée de vie d'un échantillon même si le tick n'avance pas.
+# Les caches partagés d'un capteur sont gardés sur le capteur lui-même (attribut _sensor_sample_caches): ils
+# disparaissent avec lui et ne peuvent pas être confondus avec ceux d'un autre objet.
+class SensorSampleCache:
+    _tick = 0
+    SENSOR_ATTRIBUTE = '_sensor_sample_caches'
+
+    def __init__(self, read: Callable, max_age: float or None = 0.02) -> None:
+        if not callable(read):
+            raise Exception("Read: Expecting Callable Input")
+        if max_age is not None and (not isinstance(max_age, float) or max_age < 0):
+            raise Exception("Max_Age: Expecting Positive Float Input")
+        self.__read = read
+        self.__name = getattr(read, '__qualname__', type(read).__name__)
+        self.__max_age = max_age
+        self.__value = None
+        self.__tick = -1
+        self.__sample_time = 0.0
+        self.__read_count = 0
+
+    @staticmethod
+    def advance_tick() -> None:
+        SensorSampleCache._tick += 1
+
+    # Même cache pour tous les appelants d'une même méthode d'un même capteur.
+    @staticmethod
+    def shared(sensor: any, method_name: str, max_age: float or None = 0.02) -> 'SensorSampleCache':
+        caches = SensorSampleCache.__caches_dict(sensor)
+        cache = caches.get(method_name)
+        if cache is None:
+            cache = SensorSampleCache(getattr(sensor, method_name), max_age)
+            caches[method_name] = cache
+        return cache
+
+    # Caches partagés d'un capteur: nom de méthode -> SensorSampleCache
+    @staticmethod
+    def caches_of(sensor: any) -> dict:
+        try:
+            return dict(vars(sensor).get(SensorSampleCache.SENSOR_ATTRIBUTE, {}))
+        except TypeError:
+            return {}
+
+    @staticmethod
+    def __caches_dict(sensor: any) -> dict:
+        try:
+            attributes = vars(sensor)
+        except TypeError:
+            raise Exception("Sensor: Expecting An Object With A __dict__ To Hold Its Sample Caches")
+        caches = attributes.get(SensorSampleCache.SENSOR_ATTRIBUTE)
+        if caches is None:
+            caches = {}
+            attributes[SensorSampleCache.SENSOR_ATTRIBUTE] = caches
+        return caches
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def max_age(self) -> float or None:
+        return self.__max_age
+
+    @property
+    def read_count(self) -> int:
+        return self.__read_count
+
+    def sample(self) -> any:
+        now = Clock.current.now()
+        if self.__tick != SensorSampleCache._tick \
+                or (self.__max_age is not None and now - self.__sample_time > self.__max_age):
+            self.__value = self.__read()
+            self.__tick = SensorSampleCache._tick
+            self.__sample_time = now
+            self.__read_count += 1
+        return self.__value
+
+    def invalidate(self) -> None:
+        self.__tick = -1
+
+
 """
            ______________________________________
   ________|                                      |_______
@@ -904,6 +2763,8 @@ class StateValueCondition(MonitoredStateCondition):
 
 
 class RemoteValueCondition(Condition):
+    __slots__ = ('_remote_control', '__expected_value', '__keycodes', '__remote_sample')
+
     lastreading = None
     lastreadingchecked = False
 
@@ -919,57 +2780,432 @@ class RemoteValueCondition(Condition):
             raise Exception("Inverse: Expecting Bool Input")
         if remote_control.__class__.__name__ != "Remote":
             raise Exception("Remote_Control: Expecting ", remotecontrol.__class__.__name__, " Input")
+        self.__remote_sample = SensorSampleCache.shared(remote_control, 'get_remote_code')
+
+        super().__init__(inverse)
+
+    def _compare(self) -> bool:
+        newreading = self.__remote_sample.sample()
+        # debounce
+        if newreading != RemoteValueCondition.lastreading:
+            RemoteValueCondition.lastreading = newreading
+            RemoteValueCondition.lastreadingchecked = False
+
+        if newreading == self.__expected_value:
+            if RemoteValueCondition.lastreadingchecked:
+                return False
+            else:
+                RemoteValueCondition.lastreadingchecked = True
+                return True
+        else:
+            return False
+
+    @property
+    def expected_value(self) -> str:
+        return self.__expected_value
+
+    @expected_value.setter
+    def expected_value(self, new_expected_value: str):
+        if new_expected_value in self.__keycodes:
+            self.__expected_value = new_expected_value
+        else:
+            raise Exception("New_Expected_Value: Expecting Valid Keycode")
+
+
+# Lit la télécommande une fois par tick (SensorSampleCache) et fait l'anti-rebond pour cette télécommande: une
+# touche maintenue n'est livrée qu'une fois, jusqu'à ce que la lecture change.
+class RemoteDispatcher:
+    KEYCODES = ('', 'up', 'left', 'ok', 'right', 'down', '1', '2', '3', '4', '5', '6', '7', '8', '9', '*', '0', '#')
+    _dispatchers = {}
+
+    def __init__(self, remote_control: 'RemoteControl'):
+        if remote_control.__class__.__name__ != "Remote":
+            raise Exception("Remote_Control: Expecting ", remote_control.__class__.__name__, " Input")
+        self.__remote_control = remote_control
+        self.__sample = SensorSampleCache.shared(remote_control, 'get_remote_code')
+        self.__last_reading = None
+        self.__consumed = False
+
+    # Même répartiteur (donc même anti-rebond) pour toutes les transitions d'une même télécommande.
+    @staticmethod
+    def of(remote_control: 'RemoteControl') -> 'RemoteDispatcher':
+        dispatcher = RemoteDispatcher._dispatchers.get(id(remote_control))
+        if dispatcher is None:
+            dispatcher = RemoteDispatcher(remote_control)
+            RemoteDispatcher._dispatchers[id(remote_control)] = dispatcher
+        return dispatcher
+
+    @property
+    def remote_control(self) -> 'RemoteControl':
+        return self.__remote_control
+
+    @property
+    def last_reading(self) -> str or None:
+        return self.__last_reading
+
+    # Touche lue à ce tick, ou None si elle a déjà été livrée
+    def pending_key(self) -> str or None:
+        reading = self.__sample.sample()
+        if reading != self.__last_reading:
+            self.__last_reading = reading
+            self.__consumed = False
+        return None if self.__consumed else reading
+
+    def dispatch(self, bindings: dict) -> 'State' or None:
+        state = bindings.get(self.pending_key())
+        if state is not None:
+            self.__consumed = True
+        return state
+
+
+# Vraie si la touche en attente a une destination; ne la consomme pas.
+class RemoteKeyCondition(Condition):
+    __slots__ = ('__dispatcher', '__bindings')
+
+    def __init__(self, dispatcher: 'RemoteDispatcher', bindings: dict, inverse: bool = False):
+        if not isinstance(dispatcher, RemoteDispatcher):
+            raise Exception("Dispatcher: Expecting RemoteDispatcher Input")
+        if not isinstance(bindings, dict):
+            raise Exception("Bindings: Expecting Dict Input")
+        super().__init__(inverse)
+        self.__dispatcher = dispatcher
+        self.__bindings = bindings
+
+    def _compare(self) -> bool:
+        return self.__dispatcher.pending_key() in self.__bindings
+
+
+# Toutes les touches d'un état dans un dict touche -> état: une lecture et une recherche par tick, peu importe
+# le nombre de touches. next_state est fixé à la destination de la touche livrée juste avant la transition.
+# Une touche liée après Layout.freeze() vers un état hors du layout gelé fait regeler le layout au moment où elle
+# est livrée (FiniteStateMachine); une BatchFiniteStateMachine, dont les tableaux sont déjà dimensionnés, la refuse.
+class RemoteDispatchTransition(RemoteControlTransition):
+    __slots__ = ('__dispatcher', '__bindings')
+
+    def __init__(self, remote_control: 'RemoteControl', key: str, next_state: 'State'):
+        self.__dispatcher = RemoteDispatcher.of(remote_control)
+        self.__bindings = {}
+        super().__init__(RemoteKeyCondition(self.__dispatcher, self.__bindings), next_state, remote_control)
+        self.bind(key, next_state)
+
+    @property
+    def remote_control(self) -> 'RemoteControl':
+        return self._remote_control
+
+    @property
+    def dispatcher(self) -> 'RemoteDispatcher':
+        return self.__dispatcher
+
+    @property
+    def bindings(self) -> dict:
+        return self.__bindings
+
+    def bind(self, key: str, next_state: 'State') -> None:
+        if key not in RemoteDispatcher.KEYCODES:
+            raise Exception("Key: Expecting Valid Keycode")
+        if not isinstance(next_state, State):
+            raise Exception("Next_State: Expecting State Input")
+        self.__bindings[key] = next_state
+
+    def is_transiting(self) -> bool:
+        state = self.__dispatcher.dispatch(self.__bindings)
+        if state is None:
+            return False
+        self.next_state = state
+        return True
+
+"""
+           ______________________________________
+  ________|                                      |_______
+  \       |         DistanceSenserCondition      |      /
+   \      |                                      |     /
+   /      |______________________________________|     \ 
+  /__________)                                (_________\ 
+
+"""
+class DistanceSenserCondition(Condition):
+    __slots__ = ('_distance_sensor', '__expected_value', '__distance_sample')
+
+
+    def __init__(self, expected_value: int, distance_sensor = None, inverse: bool = False): #todo: type hinting
+        self._distance_sensor = distance_sensor
+        self.__distance_sample = SensorSampleCache.shared(distance_sensor, 'read_mm')
+        self.__expected_value = expected_value
+        super().__init__(inverse)
+
+    def _compare(self) -> bool:
+        return self.__distance_sample.sample() >= self.__expected_value
+
+"""
+           ______________________________________
+  ________|                                      |_______
+  \       |      FilteredDistanceCondition       |      /
+   \      |                                      |     /
+   /      |______________________________________|     \ 
+  /__________)                                (_________\ 
+
+"""
+
+
+# Filtre des lectures du capteur de distance, gardées dans un tampon circulaire. Un échantillon est ajouté à
+# chaque nouvelle lecture de SensorSampleCache (nouveau tick ou échantillon plus vieux que max_age), donc aussi
+# dans une boucle qui appelle track() sans avancer le tick. MEDIAN: la fenêtre est aussi tenue triée dans un
+# array; l'échantillon sortant est remplacé sur place par l'entrant, qui glisse jusqu'à son rang: O(1) pour une
+# distance qui varie peu d'une lecture à l'autre, au pire la fenêtre. La médiane se lit ensuite en O(1).
+# EMA: moyenne exponentielle, O(1). Un même filtre peut être partagé par plusieurs conditions.
+# min_samples (par défaut la moitié de la fenêtre, arrondie au-dessus): nombre d'échantillons depuis reset() avant
+# que le filtre soit is_ready; avant, une seule lecture bruitée ferait toute la valeur.
+class DistanceFilter:
+    class Mode(Enum):
+        MEDIAN = "median"
+        EMA = "ema"
+
+    def __init__(self, distance_sensor, mode: 'DistanceFilter.Mode' = Mode.MEDIAN, window: int = 5,
+                 alpha: float = 0.3, min_samples: int = None) -> None:  # todo: type hinting distance_sensor
+        if not isinstance(mode, DistanceFilter.Mode):
+            raise Exception("Mode: Expecting DistanceFilter.Mode Input")
+        if isinstance(window, bool) or not isinstance(window, int) or window <= 0:
+            raise Exception("Window: Expecting Positive Integer Input")
+        if not isinstance(alpha, float) or not 0.0 < alpha <= 1.0:
+            raise Exception("Alpha: Expecting Float Input Between 0 And 1")
+        if min_samples is None:
+            min_samples = (window + 1) // 2
+        if isinstance(min_samples, bool) or not isinstance(min_samples, int) or not 0 < min_samples <= window:
+            raise Exception("Min_Samples: Expecting Integer Input Between 1 And Window")
+        self.__sample = SensorSampleCache.shared(distance_sensor, 'read_mm')
+        self.__min_samples = min_samples
+        self.__mode = mode
+        self.__window = window
+        self.__alpha = alpha
+        self.__read_count = -1
+        self.reset()
+
+    @property
+    def mode(self) -> 'DistanceFilter.Mode':
+        return self.__mode
+
+    @property
+    def window(self) -> int:
+        return self.__window
+
+    @property
+    def sample_count(self) -> int:
+        return self.__count
+
+    @property
+    def min_samples(self) -> int:
+        return self.__min_samples
+
+    @property
+    def is_ready(self) -> bool:
+        return self.__count >= self.__min_samples
+
+    def reset(self) -> None:
+        self.__buffer = array('d', bytes(8 * self.__window))
+        self.__sorted = array('d', bytes(8 * self.__window))
+        self.__index = 0
+        self.__count = 0
+        self.__ema = 0.0
+
+    def __push(self, distance: float) -> None:
+        if self.__mode is DistanceFilter.Mode.EMA:
+            self.__ema = distance if self.__count == 0 else self.__ema + (distance - self.__ema) * self.__alpha
+        else:
+            ordered = self.__sorted
+            size = min(self.__count, self.__window)
+            if self.__count >= self.__window:
+                position = bisect.bisect_left(ordered, self.__buffer[self.__index], 0, size)
+            else:
+                position = size
+                size += 1
+            while position > 0 and ordered[position - 1] > distance:
+                ordered[position] = ordered[position - 1]
+                position -= 1
+            while position < size - 1 and ordered[position + 1] < distance:
+                ordered[position] = ordered[position + 1]
+                position += 1
+            ordered[position] = distance
+        self.__buffer[self.__index] = distance
+        self.__index = (self.__index + 1) % self.__window
+        self.__count += 1
+
+    @property
+    def value(self) -> float:
+        distance = self.__sample.sample()
+        if self.__sample.read_count != self.__read_count or self.__count == 0:
+            self.__read_count = self.__sample.read_count
+            self.__push(float(distance))
+        if self.__mode is DistanceFilter.Mode.EMA:
+            return self.__ema
+        size = min(self.__count, self.__window)
+        middle = size // 2
+        if size % 2:
+            return self.__sorted[middle]
+        return (self.__sorted[middle - 1] + self.__sorted[middle]) / 2.0
+
+
+# Comparaison avec hystérésis sur la distance filtrée. Si enter_distance >= exit_distance, la condition devient
+# vraie à enter_distance ou plus et ne redevient fausse que sous exit_distance; sinon, elle devient vraie sous
+# enter_distance et ne redevient fausse qu'à exit_distance ou plus. Avec owner_state, le filtre et l'hystérésis
+# repartent à zéro à chaque nouvelle entrée dans cet état: les échantillons d'une visite précédente ne décident
+# pas des premiers ticks. L'entrée est détectée par entry_count, les états du robot redéfinissant
+# _do_entering_action sans exécuter les actions ajoutées. Tant que le filtre n'est pas is_ready, la condition
+# reste fausse (inverse compris).
+class FilteredDistanceCondition(Condition):
+    __slots__ = ('__filter', '__enter_distance', '__exit_distance', '__above', '__active', '__owner_state',
+                 '__owner_entry_count')
+
+    def __init__(self, distance_filter: 'DistanceFilter', enter_distance: int, exit_distance: int = None,
+                 inverse: bool = False, owner_state: 'MonitoredState' = None):
+        if not isinstance(distance_filter, DistanceFilter):
+            raise Exception("Distance_Filter: Expecting DistanceFilter Input")
+        if not isinstance(enter_distance, (int, float)):
+            raise Exception("Enter_Distance: Expecting Numerical Input")
+        if exit_distance is None:
+            exit_distance = enter_distance
+        if not isinstance(exit_distance, (int, float)):
+            raise Exception("Exit_Distance: Expecting Numerical Input")
+        if not isinstance(inverse, bool):
+            raise Exception("Inverse: Expecting Bool Input")
+        if owner_state is not None and not isinstance(owner_state, MonitoredState):
+            raise Exception("Owner_State: Expecting MonitoredState Input")
+
+        super().__init__(inverse)
+        self.__filter = distance_filter
+        self.__enter_distance = enter_distance
+        self.__exit_distance = exit_distance
+        self.__above = enter_distance >= exit_distance
+        self.__active = False
+        self.__owner_state = owner_state
+        self.__owner_entry_count = 0 if owner_state is None else owner_state.entry_count
 
+    @property
+    def owner_state(self) -> 'MonitoredState' or None:
+        return self.__owner_state
 
-        super().__init__(inverse)
+    def reset(self) -> None:
+        self.__filter.reset()
+        self.__active = False
 
-    def _compare(self) -> bool:
-        newreading = self._remote_control.get_remote_code()
-        # debounce
-        if newreading != RemoteValueCondition.lastreading:
-            RemoteValueCondition.lastreading = newreading
-            RemoteValueCondition.lastreadingchecked = False
+    @property
+    def distance_filter(self) -> 'DistanceFilter':
+        return self.__filter
 
-        if newreading == self.__expected_value:
-            if RemoteValueCondition.lastreadingchecked:
-                return False
-            else:
-                RemoteValueCondition.lastreadingchecked = True
-                return True
-        else:
-            return False
+    @property
+    def enter_distance(self) -> int:
+        return self.__enter_distance
 
     @property
-    def expected_value(self) -> str:
-        return self.__expected_value
+    def exit_distance(self) -> int:
+        return self.__exit_distance
 
-    @expected_value.setter
-    def expected_value(self, new_expected_value: str):
-        if new_expected_value in self.__keycodes:
-            self.__expected_value = new_expected_value
+    def _compare(self) -> bool:
+        if self.__owner_state is not None and self.__owner_state.entry_count != self.__owner_entry_count:
+            self.__owner_entry_count = self.__owner_state.entry_count
+            self.reset()
+        distance = self.__filter.value
+        if not self.__filter.is_ready:
+            self.__active = False
+            return self.inverse
+        if self.__above:
+            if self.__active:
+                self.__active = distance >= self.__exit_distance
+            else:
+                self.__active = distance >= self.__enter_distance
         else:
-            raise Exception("New_Expected_Value: Expecting Valid Keycode")
+            if self.__active:
+                self.__active = distance < self.__exit_distance
+            else:
+                self.__active = distance < self.__enter_distance
+        return self.__active
 
 """
            ______________________________________
   ________|                                      |_______
-  \       |         DistanceSenserCondition      |      /
+  \       |            BLOCKINGACTION            |      /
    \      |                                      |     /
    /      |______________________________________|     \ 
   /__________)                                (_________\ 
 
 """
-class DistanceSenserCondition(Condition):
 
 
-    def __init__(self, expected_value: int, distance_sensor = None, inverse: bool = False): #todo: type hinting
-        self._distance_sensor = distance_sensor
-        self.__expected_value = expected_value
+# Action bloquante (drive_cm(blocking=True), turn_degrees, orbit, servos...) exécutée par un fil de travail
+# pour que les ticks continuent. Un seul fil par défaut: les commandes au robot restent dans l'ordre. La fin
+# de l'action réveille les boucles run(event_driven=True) et run_async() (voir ActionCompletedCondition).
+# Un appel pendant que l'exécution précédente est en file ou en cours est ignoré: une action dans l'état
+# (add_in_state_action) n'est pas remise en file à chaque tick et rien ne reste en attente après la sortie.
+class BlockingAction:
+    MAX_WORKERS = 1
+    _executor = None
+
+    def __init__(self, action: Callable) -> None:
+        if not isinstance(action, Callable):
+            raise Exception("Action: Expecting Action (Callable) Input")
+        self.__action = action
+        self.__future = None
+
+    @staticmethod
+    def executor() -> ThreadPoolExecutor:
+        if BlockingAction._executor is None:
+            BlockingAction._executor = ThreadPoolExecutor(max_workers=BlockingAction.MAX_WORKERS,
+                                                          thread_name_prefix="fsm-action")
+        return BlockingAction._executor
+
+    @staticmethod
+    def shutdown(wait: bool = True) -> None:
+        if BlockingAction._executor is not None:
+            BlockingAction._executor.shutdown(wait=wait)
+            BlockingAction._executor = None
+
+    @property
+    def future(self) -> Future or None:
+        return self.__future
+
+    @property
+    def is_running(self) -> bool:
+        return self.__future is not None and not self.__future.done()
+
+    @property
+    def is_done(self) -> bool:
+        return self.__future is not None and self.__future.done()
+
+    @property
+    def exception(self) -> BaseException or None:
+        if not self.is_done:
+            return None
+        return self.__future.exception()
+
+    def __call__(self) -> None:
+        if self.is_running:
+            return
+        self.__future = BlockingAction.executor().submit(self.__action)
+        self.__future.add_done_callback(lambda future: FiniteStateMachine.notify())
+
+
+# Vraie quand la dernière exécution de l'action bloquante est terminée (avec ou sans exception).
+class ActionCompletedCondition(Condition):
+    __slots__ = ('__blocking_action',)
+
+    def __init__(self, blocking_action: 'BlockingAction', inverse: bool = False):
+        if not isinstance(blocking_action, BlockingAction):
+            raise Exception("Blocking_Action: Expecting BlockingAction Input")
+        if not isinstance(inverse, bool):
+            raise Exception("Inverse: Expecting Bool Input")
         super().__init__(inverse)
+        self.__blocking_action = blocking_action
+
+    @property
+    def blocking_action(self) -> 'BlockingAction':
+        return self.__blocking_action
 
     def _compare(self) -> bool:
-        print(self._distance_sensor.read_mm())
-        return self._distance_sensor.read_mm() >= self.__expected_value
+        return self.__blocking_action.is_done
+
+    # ne devient vraie que par la fin de l'action, qui appelle FiniteStateMachine.notify()
+    def _next_deadline(self) -> float or None:
+        return math.inf
+
 """
            ______________________________________
   ________|                                      |_______
@@ -981,6 +3217,8 @@ class DistanceSenserCondition(Condition):
 
 
 class ActionTransition(ConditionalTransition):
+    __slots__ = ('__transiting_actions',)
+
     Action = Callable[[], None]
 
     def __init__(self, condition: Condition = None, next_state: State = None):
@@ -989,15 +3227,121 @@ class ActionTransition(ConditionalTransition):
 
     def _do_transiting_action(self):
         for action in self.__transiting_actions:
-            action()
+            result = action()
+            if result is not None:
+                FiniteStateMachine._defer_awaitable(result)
 
-    def add_transiting_action(self, action: Action):
+    @property
+    def has_actions(self) -> bool:
+        return bool(self.__transiting_actions)
+
+    # blocking: l'action passe par un BlockingAction (retourné) pour être suivie par une ActionCompletedCondition
+    def add_transiting_action(self, action: Action, blocking: bool = False) -> Callable:
+        if not isinstance(blocking, bool):
+            raise Exception("Blocking: Expecting Bool Input")
         if isinstance(action, Callable):
+            if blocking and not isinstance(action, BlockingAction):
+                action = BlockingAction(action)
             self.__transiting_actions.append(action)
+            return action
         else:
             raise Exception("Action: Expecting Action (Callable) Input")
 
 
+"""
+           ______________________________________
+  ________|                                      |_______
+  \       |             LOGHISTOGRAM             |      /
+   \      |                                      |     /
+   /      |______________________________________|     \ 
+  /__________)                                (_________\ 
+"""
+
+
+# Histogramme à seaux logarithmiques fixes (buckets_per_decade seaux par puissance de 10 entre min_value et
+# max_value, plus un seau sous min_value et un au-dessus de max_value), compté dans un array('q'). record() est
+# O(1) et n'alloue rien dans le tampon; percentile() parcourt les seaux et retourne la borne supérieure du seau.
+class LogHistogram:
+    def __init__(self, min_value: float = 1e-6, max_value: float = 1e4, buckets_per_decade: int = 10) -> None:
+        if not isinstance(min_value, float) or min_value <= 0:
+            raise Exception("Min_Value: Expecting Positive Float Input")
+        if not isinstance(max_value, float) or max_value <= min_value:
+            raise Exception("Max_Value: Expecting Float Input Greater Than Min_Value")
+        if isinstance(buckets_per_decade, bool) or not isinstance(buckets_per_decade, int) or buckets_per_decade <= 0:
+            raise Exception("Buckets_Per_Decade: Expecting Positive Integer Input")
+        self.__min_value = min_value
+        self.__log_min = math.log10(min_value)
+        self.__buckets_per_decade = buckets_per_decade
+        self.__bucket_count = math.ceil((math.log10(max_value) - self.__log_min) * buckets_per_decade) + 2
+        self.__counts = array('q', bytes(8 * self.__bucket_count))
+        self.reset()
+
+    def reset(self) -> None:
+        for index in range(self.__bucket_count):
+            self.__counts[index] = 0
+        self.__count = 0
+        self.__total = 0.0
+        self.__min = math.inf
+        self.__max = 0.0
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def total(self) -> float:
+        return self.__total
+
+    @property
+    def mean(self) -> float:
+        return self.__total / self.__count if self.__count else 0.0
+
+    @property
+    def min(self) -> float:
+        return self.__min if self.__count else 0.0
+
+    @property
+    def max(self) -> float:
+        return self.__max
+
+    def record(self, value: float) -> None:
+        if value < self.__min_value:
+            index = 0
+        else:
+            index = int((math.log10(value) - self.__log_min) * self.__buckets_per_decade) + 1
+            if index >= self.__bucket_count:
+                index = self.__bucket_count - 1
+        self.__counts[index] += 1
+        self.__count += 1
+        self.__total += value
+        if value < self.__min:
+            self.__min = value
+        if value > self.__max:
+            self.__max = value
+
+    # Borne supérieure du seau contenant le centile demandé, ramenée dans [min, max] observés
+    def percentile(self, percent: float) -> float:
+        if not isinstance(percent, (int, float)) or not 0 <= percent <= 100:
+            raise Exception("Percent: Expecting Numerical Input Between 0 And 100")
+        if self.__count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.__count * percent / 100.0))
+        seen = 0
+        for index in range(self.__bucket_count):
+            seen += self.__counts[index]
+            if seen >= rank:
+                if index == self.__bucket_count - 1:
+                    return self.__max
+                upper = 10 ** (self.__log_min + index / self.__buckets_per_decade)
+                return min(max(upper, self.__min), self.__max)
+        return self.__max
+
+    def __str__(self) -> str:
+        return "Count: {} | Mean: {:.1f} us | p50: {:.1f} us | p95: {:.1f} us | p99: {:.1f} us | Max: {:.1f} us".format(
+            self.__count, self.mean * 1e6, self.percentile(50) * 1e6, self.percentile(95) * 1e6,
+            self.percentile(99) * 1e6, self.__max * 1e6)
+
+
 """
            ______________________________________
   ________|                                      |_______
@@ -1008,11 +3352,19 @@ class ActionTransition(ConditionalTransition):
 """
 
 
+# Les histogrammes (environ 800 octets chacun) sont en option: enable_histograms() les crée et l'enregistrement
+# commence à ce moment. Avant, leurs propriétés valent None. Layout.enable_histograms() et
+# MetricsRegistry.register_machine() les activent pour toute une machine.
 class MonitoredTransition(ActionTransition):
+    __slots__ = ('__transit_count', '__last_transit_time', '__interval_histogram', '__action_time_histogram',
+                 'custom_value')
+
     def __init__(self, condition: Condition = None, next_state: 'State' = None):
         super().__init__(condition, next_state)
         self.__transit_count: int = 0
         self.__last_transit_time: float = 0
+        self.__interval_histogram = None
+        self.__action_time_histogram = None
         self.custom_value: any = None
 
     @property
@@ -1027,16 +3379,51 @@ class MonitoredTransition(ActionTransition):
         self.__transit_count = 0
 
     def reset_last_transit_time(self):
-        self.__last_transit_time = time.perf_counter()
+        self.__last_transit_time = Clock.current.now()
+
+    @property
+    def histograms_enabled(self) -> bool:
+        return self.__interval_histogram is not None
+
+    def enable_histograms(self) -> None:
+        if self.__interval_histogram is None:
+            self.__interval_histogram = LogHistogram()
+            self.__action_time_histogram = LogHistogram()
+
+    # Temps entre deux passages (horloge Clock.current); None tant que enable_histograms() n'a pas été appelé
+    @property
+    def interval_histogram(self) -> 'LogHistogram' or None:
+        return self.__interval_histogram
+
+    # Durée des actions de transition (perf_counter); None tant que enable_histograms() n'a pas été appelé
+    @property
+    def action_time_histogram(self) -> 'LogHistogram' or None:
+        return self.__action_time_histogram
+
+    def reset_histograms(self) -> None:
+        if self.__interval_histogram is not None:
+            self.__interval_histogram.reset()
+        if self.__action_time_histogram is not None:
+            self.__action_time_histogram.reset()
 
     def _exec_transiting_action(self):
-        self.__last_transit_time = time.perf_counter()
+        now = Clock.current.now()
+        if self.__transit_count > 0 and self.__interval_histogram is not None:
+            self.__interval_histogram.record(now - self.__last_transit_time)
+        self.__last_transit_time = now
         self.__transit_count += 1
 
-        super()._exec_transiting_action()
+        if self.__action_time_histogram is None:
+            super()._exec_transiting_action()
+        else:
+            start = perf_counter()
+            super()._exec_transiting_action()
+            self.__action_time_histogram.record(perf_counter() - start)
 
 
 class ActionState(State):
+    __slots__ = ('__entering_action', '__in_state_action', '__exiting_actions', '_in_state_work')
+
     Action = Callable[[], None]
 
     def __init__(self, parameters: 'State.Parameters' = State.Parameters()) -> None:
@@ -1044,45 +3431,86 @@ class ActionState(State):
         self.__entering_action: list[ActionState.Action] = []
         self.__in_state_action: list[ActionState.Action] = []
         self.__exiting_actions: list[ActionState.Action] = []
+        # vrai si un tick dans l'état fait du travail: action ajoutée ou _do_in_state_action redéfinie
+        self._in_state_work = type(self)._do_in_state_action is not ActionState._do_in_state_action
 
     def _do_entering_action(self) -> None:
         for action in self.__entering_action:
-            action()
+            result = action()
+            if result is not None:
+                FiniteStateMachine._defer_awaitable(result)
 
     def _do_in_state_action(self) -> None:
         for action in self.__in_state_action:
-            action()
+            result = action()
+            if result is not None:
+                FiniteStateMachine._defer_awaitable(result)
 
     def _do_exiting_action(self) -> None:
         for action in self.__exiting_actions:
-            action()
+            result = action()
+            if result is not None:
+                FiniteStateMachine._defer_awaitable(result)
+
+    @property
+    def next_deadline(self) -> float or None:
+        if self.__in_state_action:
+            return None
+        return super().next_deadline
+
+    @property
+    def has_actions(self) -> bool:
+        return bool(self.__entering_action or self.__in_state_action or self.__exiting_actions)
 
-    def add_entering_action(self, action: Callable) -> None:
+    # blocking: voir ActionTransition.add_transiting_action
+    def add_entering_action(self, action: Callable, blocking: bool = False) -> Callable:
+        if not isinstance(blocking, bool):
+            raise Exception("Blocking: Expecting Bool Input")
         if isinstance(action, Callable):
+            if blocking and not isinstance(action, BlockingAction):
+                action = BlockingAction(action)
             self.__entering_action.append(action)
+            return action
         else:
             raise Exception("Action: Expecting Action (Callable) Input")
 
-    def add_in_state_action(self, action: 'Callable') -> None:
+    def add_in_state_action(self, action: 'Callable', blocking: bool = False) -> Callable:
+        if not isinstance(blocking, bool):
+            raise Exception("Blocking: Expecting Bool Input")
         if isinstance(action, Callable):
+            if blocking and not isinstance(action, BlockingAction):
+                action = BlockingAction(action)
             self.__in_state_action.append(action)
+            self._in_state_work = True
+            return action
         else:
             raise Exception("Action: Expecting Action (Callable) Input")
 
-    def add_exiting_action(self, action: 'Callable') -> None:
+    def add_exiting_action(self, action: 'Callable', blocking: bool = False) -> Callable:
+        if not isinstance(blocking, bool):
+            raise Exception("Blocking: Expecting Bool Input")
         if isinstance(action, Callable):
+            if blocking and not isinstance(action, BlockingAction):
+                action = BlockingAction(action)
             self.__exiting_actions.append(action)
+            return action
         else:
             raise Exception("Action: Expecting Action (Callable) Input")
 
 
+# Comme pour MonitoredTransition, les histogrammes ne sont créés (et alimentés) qu'à partir de
+# enable_histograms(). entry_count est toujours compté.
 class MonitoredState(ActionState):
+    __slots__ = ('__entry_count', '__counter_last_entry', '__counter_last_exit', '__dwell_histogram',
+                 '__in_state_cost_histogram', 'custom_value')
 
     def __init__(self, parameters: 'State.Parameters' = State.Parameters()) -> None:
         super().__init__(parameters)
         self.__counter_last_entry: float = 0
         self.__counter_last_exit: float = 0
         self.__entry_count: int = 0
+        self.__dwell_histogram = None
+        self.__in_state_cost_histogram = None
         self.custom_value: any = None
 
     @property
@@ -1101,26 +3529,493 @@ class MonitoredState(ActionState):
         self.__entry_count = 0
 
     def reset_last_times(self) -> None:
-        val = time.perf_counter()
+        val = Clock.current.now()
         self.__counter_last_entry = val
         self.__counter_last_exit = val
+        Condition._timing_generation += 1
 
     def _exec_entering_action(self) -> None:
-        self.__counter_last_entry = time.perf_counter()
+        self.__counter_last_entry = Clock.current.now()
         self.__entry_count += 1
+        Condition._timing_generation += 1
+        super()._exec_entering_action()
+
+    @property
+    def histograms_enabled(self) -> bool:
+        return self.__dwell_histogram is not None
+
+    def enable_histograms(self) -> None:
+        if self.__dwell_histogram is None:
+            self.__dwell_histogram = LogHistogram()
+            self.__in_state_cost_histogram = LogHistogram()
+
+    # Temps passé dans l'état par visite (horloge Clock.current), enregistré à la sortie; None tant que
+    # enable_histograms() n'a pas été appelé
+    @property
+    def dwell_histogram(self) -> 'LogHistogram' or None:
+        return self.__dwell_histogram
+
+    # Coût (perf_counter) des actions dans l'état par tick; vide si l'état n'a pas de travail par tick
+    @property
+    def in_state_cost_histogram(self) -> 'LogHistogram' or None:
+        return self.__in_state_cost_histogram
+
+    def reset_histograms(self) -> None:
+        if self.__dwell_histogram is not None:
+            self.__dwell_histogram.reset()
+        if self.__in_state_cost_histogram is not None:
+            self.__in_state_cost_histogram.reset()
+
+    def time_statistics(self) -> str:
+        dwell = self.__dwell_histogram
+        cost = self.__in_state_cost_histogram
+        if dwell is None:
+            return "{} | Entries: {} | Histograms: disabled (enable_histograms())".format(type(self).__name__,
+                                                                                         self.__entry_count)
+        return "{} | Entries: {} | Dwell: total {:.3f} s, p50 {:.3f} s, p95 {:.3f} s, p99 {:.3f} s | " \
+               "In-state: ticks {}, total {:.1f} us, p50 {:.1f} us, p95 {:.1f} us, p99 {:.1f} us".format(
+                type(self).__name__, self.__entry_count, dwell.total, dwell.percentile(50), dwell.percentile(95),
+                dwell.percentile(99), cost.count, cost.total * 1e6, cost.percentile(50) * 1e6,
+                cost.percentile(95) * 1e6, cost.percentile(99) * 1e6)
+
+    def _exec_in_state_action(self) -> None:
+        if self._in_state_work and self.__in_state_cost_histogram is not None:
+            start = perf_counter()
+            self._do_in_state_action()
+            self.__in_state_cost_histogram.record(perf_counter() - start)
+        else:
+            self._do_in_state_action()
+
+    def _exec_exiting_action(self) -> None:
+        self.__counter_last_exit = Clock.current.now()
+        if self.__entry_count > 0 and self.__dwell_histogram is not None:
+            self.__dwell_histogram.record(self.__counter_last_exit - self.__counter_last_entry)
+        super()._exec_exiting_action()
+
+
+# État hiérarchique: il contient une région (une FiniteStateMachine enfant) qui entre avec lui, est suivie
+# (track) à chacun de ses ticks et sort avec lui. Les transitions du parent sont évaluées avant le tick de la
+# région et ont donc préséance. Pour un état hiérarchique lié au robot: class X(RobotState, CompositeState).
+class CompositeState(MonitoredState):
+    def __init__(self, parameters: 'State.Parameters' = State.Parameters()) -> None:
+        super().__init__(parameters)
+        self.__region = None
+
+    @property
+    def region(self) -> 'FiniteStateMachine' or None:
+        return self.__region
+
+    def set_region(self, layout: 'FiniteStateMachine.Layout') -> None:
+        self.__region = FiniteStateMachine(layout)
+
+    @property
+    def next_deadline(self) -> float or None:
+        if self.__region is None:
+            return super().next_deadline
+        return FiniteStateMachine._earliest_deadline(super().next_deadline, self.__region.next_deadline)
+
+    def _exec_entering_action(self) -> None:
         super()._exec_entering_action()
+        if self.__region is not None:
+            self.__region.reset()
+
+    # dans _do_in_state_action pour que le tick de la région compte dans in_state_cost_histogram
+    def _do_in_state_action(self) -> None:
+        if self.__region is not None and \
+                self.__region.current_operational_state != FiniteStateMachine.OperationalState.TERMINAL_REACHED:
+            self.__region.track()
+        super()._do_in_state_action()
 
     def _exec_exiting_action(self) -> None:
-        self.__counter_last_exit = time.perf_counter()
+        if self.__region is not None and self.__region.current_applicative_state is not None:
+            self.__region.current_applicative_state._exec_exiting_action()
+            self.__region.stop()
         super()._exec_exiting_action()
 
 
 class RobotState(MonitoredState):
+    __slots__ = ('_robot',)
+
     def __init__(self, a_robot, parameters: 'State.Parameters' = State.Parameters()) -> None:
         self._robot = a_robot
         super().__init__(parameters)
 
 
+# Compare les classes à __slots__ (états, paramètres, transitions, conditions) avec leur disposition d'origine à
+# __dict__: chaque instance est recopiée dans une classe ordinaire qui porte les mêmes attributs, dans le même ordre.
+# Les valeurs par défaut correspondent à un Raspberry Pi: quelques dizaines de machines de quelques dizaines d'états.
+class SlotsBenchmark:
+    MACHINE_COUNT = 32
+    STATE_COUNT = 16
+    READ_COUNT = 200000
+
+    def __init__(self, machine_count: int = MACHINE_COUNT, state_count: int = STATE_COUNT,
+                 read_count: int = READ_COUNT) -> None:
+        if not isinstance(machine_count, int) or machine_count < 1:
+            raise Exception("Machine_Count: Expecting Positive Int Input")
+        if not isinstance(state_count, int) or state_count < 2:
+            raise Exception("State_Count: Expecting Int Input Of At Least 2")
+        if not isinstance(read_count, int) or read_count < 1:
+            raise Exception("Read_Count: Expecting Positive Int Input")
+        self.__machine_count = machine_count
+        self.__state_count = state_count
+        self.__read_count = read_count
+        self.__instance_count = 0
+        self.__slots_memory = None
+        self.__dict_memory = None
+        self.__slots_read_time = None
+        self.__dict_read_time = None
+
+    @property
+    def instance_count(self) -> int:
+        return self.__instance_count
+
+    @property
+    def slots_memory(self) -> int or None:
+        return self.__slots_memory
+
+    @property
+    def dict_memory(self) -> int or None:
+        return self.__dict_memory
+
+    @property
+    def slots_read_time(self) -> float or None:
+        return self.__slots_read_time
+
+    @property
+    def dict_read_time(self) -> float or None:
+        return self.__dict_read_time
+
+    # Un anneau d'états par machine, chaque transition combinant une durée et une valeur comme le font les
+    # clignotants et les tâches du robot.
+    def __build(self) -> list:
+        instances = []
+        for _ in range(self.__machine_count):
+            parameters = State.Parameters()
+            states = [MonitoredState(parameters) for _ in range(self.__state_count)]
+            instances.append(parameters)
+            for index, state in enumerate(states):
+                duration = StateEntryDurationCondition(1.0, state)
+                value = ValueCondition(False, True)
+                condition = AllConditions()
+                condition.add_conditions([duration, value])
+                transition = MonitoredTransition(condition, states[(index + 1) % len(states)])
+                state.add_transition(transition)
+                instances.extend((state, duration, value, condition, transition))
+        return instances
+
+    @staticmethod
+    def __attribute_names(cls: type) -> list:
+        names = []
+        for base in reversed(cls.__mro__):
+            for name in base.__dict__.get('__slots__', ()):
+                if name.startswith('__') and not name.endswith('__'):
+                    name = '_' + base.__name__.lstrip('_') + name
+                names.append(name)
+        return names
+
+    # Une classe ordinaire par classe d'origine afin que CPython partage les clés des dictionnaires d'instances
+    # comme il le faisait avant l'ajout des __slots__.
+    @staticmethod
+    def __layouts(instances: list) -> dict:
+        layouts = {}
+        for instance in instances:
+            cls = type(instance)
+            if cls not in layouts:
+                names = [name for name in SlotsBenchmark.__attribute_names(cls) if hasattr(instance, name)]
+                layouts[cls] = (type(cls.__name__, (), {}), names)
+        return layouts
+
+    @staticmethod
+    def __copy(instances: list, layouts: dict, with_dict: bool) -> list:
+        copies = []
+        for instance in instances:
+            dict_class, names = layouts[type(instance)]
+            copy = object.__new__(dict_class if with_dict else type(instance))
+            for name in names:
+                setattr(copy, name, getattr(instance, name))
+            copies.append(copy)
+        return copies
+
+    @staticmethod
+    def __measure_memory(instances: list, layouts: dict, with_dict: bool) -> tuple:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        copies = SlotsBenchmark.__copy(instances, layouts, with_dict)
+        used = tracemalloc.get_traced_memory()[0] - before
+        if not tracing:
+            tracemalloc.stop()
+        return copies, used
+
+    # Lit tous les attributs de chaque instance avec un attrgetter par liste de noms, comme les accès faits par
+    # track() dans les états, transitions et conditions.
+    def __measure_reads(self, copies: list, names: list) -> float:
+        readers = {}
+        for attribute_names in names:
+            if attribute_names not in readers:
+                readers[attribute_names] = attrgetter(*attribute_names) if attribute_names else (lambda o: None)
+        calls = [(copy, readers[attribute_names]) for copy, attribute_names in zip(copies, names)]
+        reads_per_pass = max(1, sum(len(attribute_names) for attribute_names in names))
+        passes = max(1, self.__read_count // reads_per_pass)
+        start = perf_counter()
+        for _ in range(passes):
+            for copy, reader in calls:
+                reader(copy)
+        return (perf_counter() - start) / (passes * reads_per_pass)
+
+    def run(self) -> 'SlotsBenchmark':
+        instances = self.__build()
+        layouts = SlotsBenchmark.__layouts(instances)
+        names = [tuple(layouts[type(instance)][1]) for instance in instances]
+        slots_copies, self.__slots_memory = SlotsBenchmark.__measure_memory(instances, layouts, False)
+        dict_copies, self.__dict_memory = SlotsBenchmark.__measure_memory(instances, layouts, True)
+        self.__slots_read_time = self.__measure_reads(slots_copies, names)
+        self.__dict_read_time = self.__measure_reads(dict_copies, names)
+        self.__instance_count = len(instances)
+        return self
+
+    def report(self) -> str:
+        if self.__slots_memory is None:
+            self.run()
+        saved = 1.0 - self.__slots_memory / self.__dict_memory if self.__dict_memory else 0.0
+        speedup = self.__dict_read_time / self.__slots_read_time if self.__slots_read_time else 0.0
+        return ("Instances: {} ({} machines x {} states)\n"
+                "Memory: __slots__ {:.1f} KiB | __dict__ {:.1f} KiB | Saved: {:.0%}\n"
+                "Attribute read: __slots__ {:.1f} ns | __dict__ {:.1f} ns | Speedup: {:.2f}x"
+                .format(self.__instance_count, self.__machine_count, self.__state_count,
+                        self.__slots_memory / 1024, self.__dict_memory / 1024, saved,
+                        self.__slots_read_time * 1e9, self.__dict_read_time * 1e9, speedup))
+
+
+# Layouts déclaratifs en JSON. Un fichier décrit les états, leurs paramètres et les liens par couleur (mêmes
+# couleurs que les méthodes _<couleur>_link de FiniteStateMachine). Les fabriques d'états, actions, télécommandes,
+# télémètres et filtres sont liés par nom au chargement (voir README):
+#
+#   {"initial": "off",
+#    "states": {"off": {"factory": "off"}, "on": {"factory": "on", "entering": "beep"}},
+#    "links": [{"color": "green", "from": "off", "to": "on", "duration": 0.5, "name": "off_to_on"}]}
+#
+# Le document est validé puis ramené à une forme où les états sont désignés par leur indice (compile()), et le
+# layout est construit par les mêmes méthodes _<couleur>_link qu'un layout écrit à la main, puis gelé. Il n'y a
+# pas de cache sur disque: la validation et la lecture JSON coûtent peu devant la construction des états et
+# transitions, qui doit être refaite à chaque chargement (ils tiennent des fonctions et du matériel qui ne se
+# sérialisent pas).
+class LayoutLoader:
+    STATE_FLAGS = ("terminal", "do_in_state_when_entering", "do_in_state_action_when_exiting")
+    STATE_ACTIONS = ("entering", "in_state", "exiting")
+    # champs propres à chaque couleur: (obligatoires, facultatifs)
+    LINK_FIELDS = {
+        "green": ((), ("duration",)),
+        "doted_green": (("owner",), ()),
+        "orange": (("expected_value",), ()),
+        "blue": ((), ()),
+        "purple": (("key", "remote"), ()),
+        "brown": ((), ("sensor", "filter", "distance", "exit_distance")),
+    }
+
+    class LoadedLayout:
+        def __init__(self, layout: 'FiniteStateMachine.Layout', states: dict, links: dict) -> None:
+            self.layout = layout
+            self.states = states
+            self.links = links
+
+    # bindings: nom -> fabrique d'état (appelée avec le State.Parameters de l'état), action, télécommande,
+    # télémètre ou DistanceFilter.
+    def __init__(self, bindings: dict = None) -> None:
+        if bindings is not None and not isinstance(bindings, dict):
+            raise Exception("Bindings: Expecting Dict Input")
+        self.__bindings = dict(bindings) if bindings is not None else {}
+
+    @property
+    def bindings(self) -> dict:
+        return self.__bindings
+
+    def bind(self, name: str, value: any) -> None:
+        if not isinstance(name, str):
+            raise Exception("Name: Expecting String Input")
+        self.__bindings[name] = value
+
+    def load(self, path: str) -> 'LayoutLoader.LoadedLayout':
+        if not isinstance(path, str):
+            raise Exception("Path: Expecting String Input")
+        with open(path, "r", encoding="utf-8") as file:
+            document = json.load(file)
+        return self.__build(LayoutLoader.compile(document))
+
+    # Valide le document et le ramène à une forme où les états sont désignés par leur indice. Toutes les erreurs
+    # de structure sont levées ici, avant la création du moindre état.
+    @staticmethod
+    def compile(document: dict) -> dict:
+        if not isinstance(document, dict):
+            raise Exception("Layout_File: Expecting JSON Object")
+        unknown_keys = set(document) - {"initial", "states", "links"}
+        if unknown_keys:
+            raise Exception("Layout_File: Unknown Keys {}".format(sorted(unknown_keys)))
+        states = document.get("states")
+        if not isinstance(states, dict) or len(states) == 0:
+            raise Exception("Layout_File: Expecting Non Empty 'states' Object")
+        links = document.get("links", [])
+        if not isinstance(links, list):
+            raise Exception("Layout_File: Expecting 'links' List")
+
+        state_indices = {name: index for index, name in enumerate(states)}
+        compiled_states = []
+        for name, specification in states.items():
+            if not isinstance(specification, dict):
+                raise Exception("Layout_File: State '{}' Expecting JSON Object".format(name))
+            unknown_keys = set(specification) - {"factory", "custom_value"} - set(LayoutLoader.STATE_FLAGS) \
+                - set(LayoutLoader.STATE_ACTIONS)
+            if unknown_keys:
+                raise Exception("Layout_File: State '{}' Has Unknown Keys {}".format(name, sorted(unknown_keys)))
+            compiled_state = {"name": name}
+            for flag in LayoutLoader.STATE_FLAGS:
+                value = specification.get(flag, False)
+                if not isinstance(value, bool):
+                    raise Exception("Layout_File: State '{}' Expecting Bool '{}'".format(name, flag))
+                compiled_state[flag] = value
+            for key in ("factory",) + LayoutLoader.STATE_ACTIONS:
+                value = specification.get(key)
+                if value is not None and not isinstance(value, str):
+                    raise Exception("Layout_File: State '{}' Expecting Binding Name For '{}'".format(name, key))
+                compiled_state[key] = value
+            if "custom_value" in specification:
+                compiled_state["custom_value"] = specification["custom_value"]
+            compiled_states.append(compiled_state)
+
+        initial = document.get("initial")
+        if initial not in state_indices:
+            raise Exception("Layout_File: Initial State '{}' Is Not Defined".format(initial))
+
+        compiled_links = []
+        link_names = set()
+        for index, link in enumerate(links):
+            if not isinstance(link, dict):
+                raise Exception("Layout_File: Link {} Expecting JSON Object".format(index))
+            color = link.get("color")
+            if color not in LayoutLoader.LINK_FIELDS:
+                raise Exception("Layout_File: Link {} Has Unknown Color '{}'".format(index, color))
+            required, optional = LayoutLoader.LINK_FIELDS[color]
+            unknown_keys = set(link) - {"color", "from", "to", "name"} - set(required) - set(optional)
+            if unknown_keys:
+                raise Exception("Layout_File: Link {} Has Unknown Keys {}".format(index, sorted(unknown_keys)))
+            for key in ("from", "to") + required:
+                if key not in link:
+                    raise Exception("Layout_File: Link {} Missing '{}'".format(index, key))
+            for key in ("from", "to"):
+                if link[key] not in state_indices:
+                    raise Exception("Layout_File: Link {} State '{}' Is Not Defined".format(index, link[key]))
+            name = link.get("name")
+            if name is not None:
+                if not isinstance(name, str) or name in link_names:
+                    raise Exception("Layout_File: Link {} Expecting Unique String Name".format(index))
+                link_names.add(name)
+            compiled_links.append({"color": color, "from": state_indices[link["from"]],
+                                   "to": state_indices[link["to"]], "name": name,
+                                   "arguments": LayoutLoader.__compile_arguments(index, color, link, state_indices)})
+
+        return {"initial": state_indices[initial],
+                "states": compiled_states, "links": compiled_links}
+
+    @staticmethod
+    def __compile_arguments(index: int, color: str, link: dict, state_indices: dict) -> dict:
+        if color == "green":
+            duration = link.get("duration", 1.0)
+            if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration < 0:
+                raise Exception("Layout_File: Link {} Expecting Positive Number 'duration'".format(index))
+            return {"duration": float(duration)}
+        if color == "doted_green":
+            if link["owner"] not in state_indices:
+                raise Exception("Layout_File: Link {} State '{}' Is Not Defined".format(index, link["owner"]))
+            return {"owner": state_indices[link["owner"]]}
+        if color == "orange":
+            return {"expected_value": link["expected_value"]}
+        if color == "purple":
+            if not isinstance(link["key"], str) or not isinstance(link["remote"], str):
+                raise Exception("Layout_File: Link {} Expecting String 'key' And 'remote'".format(index))
+            return {"key": link["key"], "remote": link["remote"]}
+        if color == "brown":
+            if link.get("sensor") is None and link.get("filter") is None:
+                raise Exception("Layout_File: Link {} Expecting 'sensor' Or 'filter'".format(index))
+            for key in ("sensor", "filter"):
+                if link.get(key) is not None and not isinstance(link[key], str):
+                    raise Exception("Layout_File: Link {} Expecting Binding Name For '{}'".format(index, key))
+            for key in ("distance", "exit_distance"):
+                if link.get(key) is not None and (isinstance(link[key], bool) or not isinstance(link[key], int)):
+                    raise Exception("Layout_File: Link {} Expecting Int '{}'".format(index, key))
+            return {"sensor": link.get("sensor"), "filter": link.get("filter"),
+                    "distance": link.get("distance", 2000), "exit_distance": link.get("exit_distance")}
+        return {}
+
+    def __binding(self, name: str or None) -> any:
+        if name is None:
+            return None
+        if name not in self.__bindings:
+            raise Exception("Bindings: Name '{}' Is Not Bound".format(name))
+        return self.__bindings[name]
+
+    def __build(self, compiled: dict) -> 'LayoutLoader.LoadedLayout':
+        states = []
+        for specification in compiled["states"]:
+            parameters = State.Parameters(*(specification[flag] for flag in LayoutLoader.STATE_FLAGS))
+            factory = self.__binding(specification["factory"])
+            a_state = MonitoredState(parameters) if factory is None else factory(parameters)
+            if not isinstance(a_state, State):
+                raise Exception("Factory: '{}' Expecting State Output".format(specification["factory"]))
+            for key, add_action in (("entering", ActionState.add_entering_action),
+                                    ("in_state", ActionState.add_in_state_action),
+                                    ("exiting", ActionState.add_exiting_action)):
+                if specification[key] is not None:
+                    if not isinstance(a_state, ActionState):
+                        raise Exception("Factory: '{}' Expecting ActionState Output".format(specification["factory"]))
+                    add_action(a_state, self.__binding(specification[key]))
+            if "custom_value" in specification:
+                a_state.custom_value = specification["custom_value"]
+            states.append(a_state)
+
+        links = {}
+        for link in compiled["links"]:
+            origin = states[link["from"]]
+            destination = states[link["to"]]
+            arguments = link["arguments"]
+            color = link["color"]
+            if color == "green":
+                FiniteStateMachine._green_link(origin, destination, arguments["duration"])
+            elif color == "doted_green":
+                FiniteStateMachine._doted_green_link(origin, destination, states[arguments["owner"]])
+            elif color == "orange":
+                FiniteStateMachine._orange_link(origin, destination, arguments["expected_value"])
+            elif color == "blue":
+                FiniteStateMachine._blue_link(origin, destination)
+            elif color == "purple":
+                FiniteStateMachine._purple_link(arguments["key"], origin, destination,
+                                                self.__binding(arguments["remote"]))
+            else:
+                FiniteStateMachine._brown_link(self.__binding(arguments["sensor"]), origin, destination,
+                                               arguments["distance"], self.__binding(arguments["filter"]),
+                                               arguments["exit_distance"])
+            if link["name"] is not None:
+                links[link["name"]] = LayoutLoader.__created_transition(origin, link, self.__bindings)
+
+        layout = FiniteStateMachine.Layout()
+        layout.initial_state = states[compiled["initial"]]
+        layout.add_states(states)
+        layout.freeze()
+        return LayoutLoader.LoadedLayout(layout, {specification["name"]: a_state for specification, a_state
+                                                  in zip(compiled["states"], states)}, links)
+
+    # un lien violet peut réutiliser la RemoteDispatchTransition déjà présente sur l'état
+    @staticmethod
+    def __created_transition(origin: 'State', link: dict, bindings: dict) -> 'Transition':
+        if link["color"] == "purple":
+            remote_control = bindings[link["arguments"]["remote"]]
+            for transition in origin.get_transitionList:
+                if isinstance(transition, RemoteDispatchTransition) and transition.remote_control is remote_control:
+                    return transition
+        return origin.get_transitionList[-1]
+
+
 ##     ## #### ##     ## #########    ###    ##     ##          #######
 ###    ##  ##  ##     ## ##          ## ##   ##     ##         ##     ##
 ####   ##  ##  ##     ## ##         ##   ##  ##     ##                ##
@@ -1134,20 +4029,31 @@ StateGenerator = Callable[[], MonitoredState]
 
 
 class Blinker(FiniteStateMachine):
+    # Seuls on et off sont construits d'emblée: les sous-graphes durée (turn_on2/turn_off2), clignotement (blink1)
+    # et clignotement limité (blink2 à blink4) sont ajoutés au layout, puis regelés, au premier appel qui en a besoin.
     def __init__(self, off_state_generator: 'StateGenerator',
                  on_state_generator: 'StateGenerator') -> None:
         layout = FiniteStateMachine.Layout()
+        self.__off_state_generator = off_state_generator
+        self.__on_state_generator = on_state_generator
         self.__off = off_state_generator()
         self.__on = on_state_generator()
-        self.__off_duration = off_state_generator()
-        self.__on_duration = on_state_generator()
-        self.__blink_on = on_state_generator()
-        self.__blink_off = off_state_generator()
-        self.__blink_stop_off = off_state_generator()
-        self.__blink_stop_on = on_state_generator()
-        self.__blink_begin = MonitoredState()
-        self.__blink_stop_begin = MonitoredState()
-        self.__blink_stop_end = MonitoredState()
+        self.__off_duration = None
+        self.__on_duration = None
+        self.__blink_begin = None
+        self.__blink_stop_begin = None
+
+        layout.initial_state = self.__off
+        layout.add_state(self.__off)
+        layout.add_state(self.__on)
+        layout.freeze()
+        super().__init__(layout)
+
+    def __build_duration(self) -> None:
+        if self.__off_duration is not None:
+            return
+        self.__off_duration = self.__off_state_generator()
+        self.__on_duration = self.__on_state_generator()
 
         self.__off_duration_to_on = self._green_link(self.__off_duration,
                                                      self.__on)
@@ -1155,6 +4061,16 @@ class Blinker(FiniteStateMachine):
         self.__on_duration_to_off = self._green_link(original_state=self.__on_duration,
                                                      destination_state=self.__off)
 
+        self.layout.add_states([self.__off_duration, self.__on_duration])
+        self.layout.freeze()
+
+    def __build_blink(self) -> None:
+        if self.__blink_begin is not None:
+            return
+        self.__blink_on = self.__on_state_generator()
+        self.__blink_off = self.__off_state_generator()
+        self.__blink_begin = MonitoredState()
+
         self.__blink_on_to_blink_off = self._green_link(original_state=self.__blink_on,
                                                         destination_state=self.__blink_off)
         self.__blink_off_to_blink_on = self._green_link(original_state=self.__blink_off,
@@ -1168,6 +4084,17 @@ class Blinker(FiniteStateMachine):
                                                            destination_state=self.__blink_on,
                                                            expected_value=True)
 
+        self.layout.add_states([self.__blink_on, self.__blink_off, self.__blink_begin])
+        self.layout.freeze()
+
+    def __build_blink_stop(self) -> None:
+        if self.__blink_stop_begin is not None:
+            return
+        self.__blink_stop_off = self.__off_state_generator()
+        self.__blink_stop_on = self.__on_state_generator()
+        self.__blink_stop_begin = MonitoredState()
+        self.__blink_stop_end = MonitoredState()
+
         self.__blink_stop_off_to_blink_stop_end = self._doted_green_link(original_state=self.__blink_stop_off,
                                                                          destination_state=self.__blink_stop_end,
                                                                          ownerState=self.__blink_stop_begin)
@@ -1197,19 +4124,9 @@ class Blinker(FiniteStateMachine):
                                                         destination_state=self.__on,
                                                         expected_value=True)
 
-        layout.initial_state = self.__off
-        layout.add_state(self.__off)
-        layout.add_state(self.__on)
-        layout.add_state(self.__off_duration)
-        layout.add_state(self.__on_duration)
-        layout.add_state(self.__blink_on)
-        layout.add_state(self.__blink_off)
-        layout.add_state(self.__blink_stop_off)
-        layout.add_state(self.__blink_stop_on)
-        layout.add_state(self.__blink_begin)
-        layout.add_state(self.__blink_stop_begin)
-        layout.add_state(self.__blink_stop_end)
-        super().__init__(layout)
+        self.layout.add_states([self.__blink_stop_off, self.__blink_stop_on, self.__blink_stop_begin,
+                                self.__blink_stop_end])
+        self.layout.freeze()
 
     @property
     def is_on(self) -> bool:
@@ -1226,10 +4143,12 @@ class Blinker(FiniteStateMachine):
         self.transit_to(self.__off)
 
     def turn_on2(self, duration: float) -> None:
+        self.__build_duration()
         self.__off_duration_to_on.duration = duration
         self.transit_to(self.__off_duration)
 
     def turn_off2(self, duration: float) -> None:
+        self.__build_duration()
         self.__on_duration_to_off.duration = duration
         self.transit_to(self.__on_duration)
 
@@ -1240,6 +4159,7 @@ class Blinker(FiniteStateMachine):
         if percent_on <= 1.0:
             if isinstance(cycle_duration, float):
                 if isinstance(begin_on, bool):
+                    self.__build_blink()
                     self.__blink_begin.custom_value = begin_on
                     self.__blink_off_to_blink_on.duration = cycle_duration * percent_on
                     self.__blink_on_to_blink_off.duration = cycle_duration - (cycle_duration * percent_on)
@@ -1262,6 +4182,7 @@ class Blinker(FiniteStateMachine):
                 if isinstance(cycle_duration, float):
                     if isinstance(begin_on, bool):
                         if isinstance(end_off, bool):
+                            self.__build_blink_stop()
                             self.__blink_stop_begin.custom_value = begin_on
                             self.__blink_stop_end.custom_value = end_off
 
@@ -1295,6 +4216,7 @@ class Blinker(FiniteStateMachine):
                 if isinstance(total_duration, float):
                     if isinstance(begin_on, bool):
                         if isinstance(end_off, bool):
+                            self.__build_blink_stop()
                             self.__blink_stop_begin.custom_value = begin_on
                             self.__blink_stop_end.custom_value = end_off
 
@@ -1328,6 +4250,7 @@ class Blinker(FiniteStateMachine):
                 if isinstance(cycle_duration, float):
                     if isinstance(begin_on, bool):
                         if isinstance(end_off, bool):
+                            self.__build_blink_stop()
                             self.__blink_stop_begin.custom_value = begin_on
                             self.__blink_stop_end.custom_value = end_off
 
@@ -1366,6 +4289,14 @@ class SideBlinkers:
         self.__left_blinker = Blinker(left_off_state_generator, left_on_state_generator)
         self.__right_blinker = Blinker(right_off_state_generator, right_on_state_generator)
 
+    @property
+    def left_blinker(self) -> 'Blinker':
+        return self.__left_blinker
+
+    @property
+    def right_blinker(self) -> 'Blinker':
+        return self.__right_blinker
+
     def is_on(self, side: Side) -> bool:
         if isinstance(side, SideBlinkers.Side):
             if side == SideBlinkers.Side.LEFT:
@@ -1643,6 +4574,11 @@ class SideBlinkers:
         self.__left_blinker.track()
         self.__right_blinker.track()
 
+    @property
+    def next_deadline(self) -> float or None:
+        return FiniteStateMachine._earliest_deadline(self.__left_blinker.next_deadline,
+                                                     self.__right_blinker.next_deadline)
+
 
 ##     ## #### ##     ## #########    ###    ##     ##         ########   #######  ########   #######  #########
 ###    ##  ##  ##     ## ##          ## ##   ##     ##         ##     ## ##     ## ##     ## ##     ##     ##
@@ -1662,6 +4598,8 @@ class LedBlinkers(SideBlinkers):
                          lambda: LedBlinkers.LedOnRightState(self.__robot))
 
     class LedOnLeftState(RobotState):
+        __slots__ = ()
+
         def __init__(self, a_robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
 #            if isinstance(a_robot, 'Robot'): #TODO Check If Valid
                 if isinstance(parameters, State.Parameters):
@@ -1677,6 +4615,8 @@ class LedBlinkers(SideBlinkers):
             self._robot.led_on(1)
 
     class LedOffLeftState(RobotState):
+        __slots__ = ()
+
         def __init__(self, a_robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             # if isinstance(a_robot, Robot): #TODO Replace Once Line 1637 Is Checked
             if isinstance(parameters, State.Parameters):
@@ -1692,6 +4632,8 @@ class LedBlinkers(SideBlinkers):
             self._robot.led_off(1)
 
     class LedOnRightState(RobotState):
+        __slots__ = ()
+
         def __init__(self, a_robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             # if isinstance(a_robot, Robot): #TODO Replace Once Line 1637 Is Checked
             if isinstance(parameters, State.Parameters):
@@ -1707,6 +4649,8 @@ class LedBlinkers(SideBlinkers):
             self._robot.led_on(0)
 
     class LedOffRightState(RobotState):
+        __slots__ = ()
+
         def __init__(self, a_robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             # if isinstance(a_robot, Robot): #TODO Replace Once Line 1637 Is Checked
             if isinstance(parameters, State.Parameters):
@@ -1734,6 +4678,8 @@ class EyeBlinkers(SideBlinkers):
         #   raise Exception("A_Robot: Expecting Robot Input")
 
     class EyeOnLeftState(RobotState):
+        __slots__ = ('couleur',)
+
         def __init__(self, a_robot, parameters: 'State.Parameters' = State.Parameters()):
             #  if isinstance(a_robot, Robot):
             if isinstance(parameters, State.Parameters):
@@ -1750,6 +4696,8 @@ class EyeBlinkers(SideBlinkers):
             self._robot.open_left_eye()
 
     class EyeOffLeftState(RobotState):
+        __slots__ = ('couleur',)
+
         def __init__(self, a_robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             # if isinstance(a_robot, Robot): #TODO Replace Once Line 1637 Is Checked
             if isinstance(parameters, State.Parameters):
@@ -1766,6 +4714,8 @@ class EyeBlinkers(SideBlinkers):
             self._robot.close_left_eye()
 
     class EyeOnRightState(RobotState):
+        __slots__ = ('couleur',)
+
         def __init__(self, a_robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             # if isinstance(a_robot, Robot): #TODO Replace Once Line 1637 Is Checked
             if isinstance(parameters, State.Parameters):
@@ -1782,6 +4732,8 @@ class EyeBlinkers(SideBlinkers):
             self._robot.open_right_eye()
 
     class EyeOffRightState(RobotState):
+        __slots__ = ('couleur',)
+
         def __init__(self, a_robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             # if isinstance(a_robot, Robot): #TODO Replace Once Line 1637 Is Checked
             if isinstance(parameters, State.Parameters):
@@ -1798,8 +4750,100 @@ class EyeBlinkers(SideBlinkers):
             self._robot.close_right_eye()
 
 
+# Mouvements non bloquants: EasyGoPiGo3.drive_cm, turn_degrees, orbit... attendent la cible avec
+# target_reached() (deux lectures d'encodeurs) et time.sleep(0.1). Ici, la cible est calculée comme dans
+# easygopigo3 et un seul EncoderPoller par robot lit les deux encodeurs une fois par tick pour tous les
+# mouvements en cours.
+class EncoderPoller:
+    TOLERANCE = 5
+    _pollers = {}
+
+    def __init__(self, gopigo: 'easy.EasyGoPiGo3') -> None:
+        self.__sample = SensorSampleCache.shared(gopigo, 'read_encoders')
+
+    @staticmethod
+    def of(gopigo: 'easy.EasyGoPiGo3') -> 'EncoderPoller':
+        poller = EncoderPoller._pollers.get(id(gopigo))
+        if poller is None:
+            poller = EncoderPoller(gopigo)
+            EncoderPoller._pollers[id(gopigo)] = poller
+        return poller
+
+    def encoders(self) -> tuple:
+        return self.__sample.sample()
+
+    def invalidate(self) -> None:
+        self.__sample.invalidate()
+
+    # Même tolérance que EasyGoPiGo3.target_reached, avec une seule lecture des deux moteurs
+    def target_reached(self, left_target_degrees: float, right_target_degrees: float) -> bool:
+        left_position, right_position = self.encoders()
+        return abs(left_position - left_target_degrees) < EncoderPoller.TOLERANCE \
+            and abs(right_position - right_target_degrees) < EncoderPoller.TOLERANCE
+
+
+class MotionFuture:
+    def __init__(self, poller: 'EncoderPoller', left_target_degrees: float, right_target_degrees: float,
+                 on_done: Callable = None) -> None:
+        self.__poller = poller
+        self.__left_target = left_target_degrees
+        self.__right_target = right_target_degrees
+        self.__on_done = on_done
+        self.__done = False
+
+    @property
+    def left_target(self) -> float:
+        return self.__left_target
+
+    @property
+    def right_target(self) -> float:
+        return self.__right_target
+
+    @property
+    def is_done(self) -> bool:
+        if not self.__done and self.__poller.target_reached(self.__left_target, self.__right_target):
+            self.__done = True
+            if self.__on_done is not None:
+                self.__on_done()
+        return self.__done
+
+    # Attente bloquante, pour le code hors machine à états
+    def wait(self, poll_interval: float = 0.02) -> None:
+        while not self.is_done:
+            time.sleep(poll_interval)
+            self.__poller.invalidate()
+
+
+class MotionCompleteCondition(Condition):
+    __slots__ = ('__motion',)
+
+    def __init__(self, motion: 'MotionFuture' = None, inverse: bool = False):
+        if motion is not None and not isinstance(motion, MotionFuture):
+            raise Exception("Motion: Expecting MotionFuture Input")
+        if not isinstance(inverse, bool):
+            raise Exception("Inverse: Expecting Bool Input")
+        super().__init__(inverse)
+        self.__motion = motion
+
+    # Un état qui démarre un mouvement dans son action d'entrée y remet le nouveau MotionFuture
+    @property
+    def motion(self) -> 'MotionFuture' or None:
+        return self.__motion
+
+    @motion.setter
+    def motion(self, new_motion: 'MotionFuture') -> None:
+        if not isinstance(new_motion, MotionFuture):
+            raise Exception("New_Motion: Expecting MotionFuture Input")
+        self.__motion = new_motion
+
+    def _compare(self) -> bool:
+        return self.__motion is not None and self.__motion.is_done
+
+
 class Robot:
     class StopState(RobotState):
+        __slots__ = ()
+
         def __init__(self, robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             if isinstance(robot, Robot):
                 if isinstance(parameters, State.Parameters):
@@ -1816,6 +4860,8 @@ class Robot:
             self._robot.stop()
 
     class RotateRightState(RobotState):
+        __slots__ = ()
+
         def __init__(self, robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             if isinstance(robot, Robot):
                 if isinstance(parameters, State.Parameters):
@@ -1831,6 +4877,8 @@ class Robot:
             self._robot.right()
 
     class RotateLeftState(RobotState):
+        __slots__ = ()
+
         def __init__(self, robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             if isinstance(robot, Robot):
                 if isinstance(parameters, State.Parameters):
@@ -1846,6 +4894,8 @@ class Robot:
             self._robot.left()
 
     class ForwardState(RobotState):
+        __slots__ = ()
+
         def __init__(self, robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             if isinstance(robot, Robot):
                 if isinstance(parameters, State.Parameters):
@@ -1861,6 +4911,8 @@ class Robot:
             self._robot.foward()
 
     class BackwardState(RobotState):
+        __slots__ = ()
+
         def __init__(self, robot: 'Robot', parameters: 'State.Parameters' = State.Parameters()):
             if isinstance(robot, Robot):
                 if isinstance(parameters, State.Parameters):
@@ -1875,7 +4927,39 @@ class Robot:
             self._robot.led_blinkers.blink1(SideBlinkers.Side.BOTH, 1.0, 0.75)
             self._robot.backward()
 
+    # Rotation d'un angle donné sans bloquer la boucle: l'entrée démarre start_turn_degrees() et remet le
+    # MotionFuture dans motion_complete, la condition à lier vers l'état suivant (degrés négatifs: vers la gauche).
+    class TurnDegreesState(RobotState):
+        __slots__ = ('__degrees', '__motion_complete')
+
+        def __init__(self, robot: 'Robot', degrees: int, parameters: 'State.Parameters' = State.Parameters()):
+            if not isinstance(robot, Robot):
+                raise Exception("Robot: Expecting Robot Input")
+            if isinstance(degrees, bool) or not isinstance(degrees, int):
+                raise Exception("Degrees: Expecting Integer Input")
+            if not isinstance(parameters, State.Parameters):
+                raise Exception("Parameters: Expecting State.Parameters Input")
+            super().__init__(robot, parameters)
+            self.__degrees = degrees
+            self.__motion_complete = MotionCompleteCondition()
+            self.custom_value = 'left' if degrees < 0 else 'right'
+
+        @property
+        def degrees(self) -> int:
+            return self.__degrees
+
+        @property
+        def motion_complete(self) -> 'MotionCompleteCondition':
+            return self.__motion_complete
+
+        def _do_entering_action(self) -> None:
+            side = SideBlinkers.Side.LEFT if self.__degrees < 0 else SideBlinkers.Side.RIGHT
+            self._robot.led_blinkers.blink1(side, 1.0, 0.50, True)
+            self.__motion_complete.motion = self._robot.start_turn_degrees(self.__degrees)
+
     class ServoMouvementState(RobotState):
+        __slots__ = ()
+
         def __init__(self, robot: 'Robot',direction,parameters: 'State.Parameters' = State.Parameters()):
             if isinstance(robot, Robot):
                 if isinstance(parameters, State.Parameters):
@@ -1900,6 +4984,7 @@ class Robot:
 
     def __init__(self):
         self.__robot: 'easy.EasyGoPiGo3' = easy.EasyGoPiGo3()
+        self.__remotes: list = []
         self.__led_blinkers: 'LedBlinkers' = LedBlinkers(self.__robot)
         self.__eyes_blinkers: 'EyeBlinkers' = EyeBlinkers(self.__robot)
         self._distance_sensor = self.init_distance_sensor()
@@ -1913,6 +4998,15 @@ class Robot:
     def eye_blinkers(self) -> 'EyeBlinkers':
         return self.__eyes_blinkers
 
+    # Objets matériels lus par les conditions de ce robot (encodeurs sur la carte, télémètre, télécommandes
+    # créées par init_remote), par nom
+    @property
+    def sensors(self) -> dict:
+        sensors = {"gopigo": self.__robot, "distance_sensor": self._distance_sensor}
+        for index, remote in enumerate(self.__remotes):
+            sensors["remote" if index == 0 else "remote{}".format(index)] = remote
+        return sensors
+
     def change_couleur(self, couleur: tuple, side: SideBlinkers.Side):
         if isinstance(couleur, tuple):
             if isinstance(side, SideBlinkers.Side):
@@ -2042,12 +5136,77 @@ class Robot:
     def turn_degrees(self, degrees: int, blocking: bool = True) -> None:
         if isinstance(degrees, int):
             if isinstance(blocking, bool):
-                self.turn_degrees(degrees, blocking)
+                self.__robot.turn_degrees(degrees, blocking)
             else:
                 raise Exception("Blocking: Expecting Bool Input")
         else:
             raise Exception("Degrees: Expecting Integer Input between 0 and 360")
 
+    # Variantes non bloquantes: la commande est envoyée et un MotionFuture suit l'arrivée à la cible
+    def start_drive_cm(self, dist: float) -> 'MotionFuture':
+        if not isinstance(dist, float):
+            raise Exception("Dist: Expecting Float Input")
+        wheel_turn_degrees = ((dist * 10) / self.__robot.WHEEL_CIRCUMFERENCE) * 360
+        return self.__start_motion(wheel_turn_degrees, wheel_turn_degrees)
+
+    def start_drive_degrees(self, degrees: float) -> 'MotionFuture':
+        if not isinstance(degrees, float):
+            raise Exception("Degrees: Expecting Float Input")
+        return self.__start_motion(degrees, degrees)
+
+    def start_turn_degrees(self, degrees: int) -> 'MotionFuture':
+        if not isinstance(degrees, int):
+            raise Exception("Degrees: Expecting Integer Input between 0 and 360")
+        wheel_travel_distance = (self.__robot.WHEEL_BASE_CIRCUMFERENCE * degrees) / 360
+        wheel_turn_degrees = (wheel_travel_distance / self.__robot.WHEEL_CIRCUMFERENCE) * 360
+        return self.__start_motion(wheel_turn_degrees, -wheel_turn_degrees)
+
+    # La vitesse d'origine est remise quand l'orbite est terminée
+    def start_orbit(self, degrees: int, radius_cm: int = 0) -> 'MotionFuture':
+        if not isinstance(degrees, int):
+            raise Exception("Degrees: Expecting Integer Input between 0 and 360")
+        if not isinstance(radius_cm, int):
+            raise Exception("Radius_Cm: Expecting Integer Input")
+        robot = self.__robot
+        speed = robot.get_speed()
+        drive_distance = math.pi * abs(radius_cm * 10) * abs(degrees) / 180
+        drive_difference = (robot.WHEEL_BASE_CIRCUMFERENCE * degrees) / 360
+        distance_degrees = (drive_distance / robot.WHEEL_CIRCUMFERENCE) * 360
+        difference_degrees = (drive_difference / robot.WHEEL_CIRCUMFERENCE) * 360
+        left_target = distance_degrees + difference_degrees
+        right_target = distance_degrees - difference_degrees
+        if degrees < 0:
+            motor_fast, fast_target = robot.MOTOR_RIGHT, right_target
+            motor_slow, slow_target = robot.MOTOR_LEFT, left_target
+        else:
+            motor_fast, fast_target = robot.MOTOR_LEFT, left_target
+            motor_slow, slow_target = robot.MOTOR_RIGHT, right_target
+        direction = -1 if speed < 0 else 1
+        fast_speed = abs(speed)
+        slow_speed = abs((fast_speed * slow_target) / fast_target) if fast_target else fast_speed
+        robot.set_motor_limits(motor_fast, dps=fast_speed)
+        robot.set_motor_limits(motor_slow, dps=slow_speed)
+        return self.__start_motion(left_target * direction, right_target * direction, lambda: robot.set_speed(speed))
+
+    def start_reset_encoders(self) -> 'MotionFuture':
+        robot = self.__robot
+        robot.set_motor_power(robot.MOTOR_LEFT + robot.MOTOR_RIGHT, 0)
+        left_position, right_position = robot.read_encoders()
+        robot.offset_motor_encoder(robot.MOTOR_LEFT, left_position)
+        robot.offset_motor_encoder(robot.MOTOR_RIGHT, right_position)
+        poller = EncoderPoller.of(robot)
+        poller.invalidate()
+        return MotionFuture(poller, 0, 0)
+
+    def __start_motion(self, left_degrees: float, right_degrees: float, on_done: Callable = None) -> 'MotionFuture':
+        robot = self.__robot
+        start_left, start_right = robot.read_encoders()
+        robot.set_motor_position(robot.MOTOR_LEFT, start_left + left_degrees)
+        robot.set_motor_position(robot.MOTOR_RIGHT, start_right + right_degrees)
+        poller = EncoderPoller.of(robot)
+        poller.invalidate()
+        return MotionFuture(poller, start_left + left_degrees, start_right + right_degrees, on_done)
+
     def blinker_on(self, id: int) -> None:
         if isinstance(id, int):
             self.__robot.blinker_on(id)
@@ -2191,7 +5350,9 @@ class Robot:
 
     def init_remote(self, port: str = "AD1"):
         if isinstance(port, str):
-            return self.__robot.init_remote(port)
+            remote = self.__robot.init_remote(port)
+            self.__remotes.append(remote)
+            return remote
         else:
             raise Exception("Port: Expecting String Input of 'AD1'")
 
@@ -2267,8 +5428,19 @@ class C64Project(FiniteStateMachine):
         layout.add_state(self.__integrity_succeeded)
         layout.add_state(self.__shut_down_robot)
         layout.initial_state = self.__robot_instantiation
+        layout.freeze()
+        self.__tracks_blinkers = True
         super().__init__(layout)
 
+    # Confie les clignotants à un Executive plutôt que de les suivre à chaque tick de C64Project.
+    def make_executive(self, rate_hz: float = 100.0, blinker_rate_hz: float = 30.0) -> 'Executive':
+        executive = Executive()
+        executive.register(self, rate_hz, priority=2, primary=True)
+        executive.register(self._robot.eye_blinkers, blinker_rate_hz, priority=1)
+        executive.register(self._robot.led_blinkers, blinker_rate_hz, priority=1)
+        self.__tracks_blinkers = False
+        return executive
+
     def __instantiation_check(self) -> None:
         self.__robot_instantiation.custom_value = self._robot is not None and isinstance(self._robot, Robot)
 
@@ -2307,16 +5479,19 @@ class C64Project(FiniteStateMachine):
 
 
     def track(self) -> bool:
-        self._robot.eye_blinkers.track()
-        self._robot.led_blinkers.track()
-        if isinstance(self.current_applicative_state, ManualControl):
-            self.__task1.track()
-        if isinstance(self.current_applicative_state,SecondTask ):
-            self.__task2.track()
+        if self.__tracks_blinkers:
+            self._robot.eye_blinkers.track()
+            self._robot.led_blinkers.track()
         return super().track()
 
+    @property
+    def next_deadline(self) -> float or None:
+        return FiniteStateMachine._earliest_deadline(super().next_deadline,
+                                                     self._robot.eye_blinkers.next_deadline,
+                                                     self._robot.led_blinkers.next_deadline)
+
 
-class ManualControl(RobotState):
+class ManualControl(RobotState, CompositeState):
     def __init__(self, remoteControl: 'RemoteControl', robot: 'Robot',
                  parameters: 'State.Parameters' = State.Parameters()):
         if isinstance(robot, Robot):
@@ -2359,20 +5534,19 @@ class ManualControl(RobotState):
         self.__layout.add_state(self.__backwards)
         self.__layout.add_state(self.__rotate_left)
         self.__layout.add_state(self.__rotate_right)
-        self.fsm = FiniteStateMachine(self.__layout)
+        self.__layout.freeze()
+        self.set_region(self.__layout)
 
-    def track(self):
-        self.fsm.track()
 
-    def _do_entering_action(self) -> None:
-        self.fsm.track()
-
-
-class SecondTask(RobotState):
+class SecondTask(RobotState, CompositeState):
     class PossibleMovements(Enum):
         FORWARD = "forward"
         ROTATE_LEFT = "left"
         ROTATE_RIGHT = "right"
+
+    TURN_DEGREES = 90
+    TURN_TIMEOUT = 3.0
+
     def __init__(self, robot: 'Robot') -> None:
         super().__init__(robot)
 
@@ -2381,8 +5555,8 @@ class SecondTask(RobotState):
         self.__random_mouvement_picker_state.add_entering_action(lambda: self.__pick_random_mouvement())
         self.terminal_state_parameters = State.Parameters(True, False, False)
         self.__forward = self._robot.ForwardState(self._robot)
-        self.__rotate_left = self._robot.RotateLeftState(self._robot)
-        self.__rotate_right = self._robot.RotateRightState(self._robot)
+        self.__rotate_left = self._robot.TurnDegreesState(self._robot, -SecondTask.TURN_DEGREES)
+        self.__rotate_right = self._robot.TurnDegreesState(self._robot, SecondTask.TURN_DEGREES)
         self.__stop_robot = self._robot.StopState(self._robot)
         self.__stop_terminal = self._robot.StopState(self._robot,self.terminal_state_parameters)
         self.__stop_terminal.add_exiting_action(lambda:self.__terminal_exit_action)
@@ -2406,13 +5580,20 @@ class SecondTask(RobotState):
         FiniteStateMachine._orange_link(self.__servo_state_right,self.__rotate_right,
                                        self.PossibleMovements.ROTATE_RIGHT)
 
-        FiniteStateMachine._brown_link(self._robot._distance_sensor,self.__forward, self.__stop_terminal)
-        FiniteStateMachine._brown_link(self._robot._distance_sensor,self.__rotate_left, self.__stop_terminal)
-        FiniteStateMachine._brown_link(self._robot._distance_sensor,self.__rotate_right, self.__stop_terminal)
+        self.__distance_filter = DistanceFilter(self._robot._distance_sensor)
+        FiniteStateMachine._brown_link(self._robot._distance_sensor,self.__forward, self.__stop_terminal,
+                                       distance_filter=self.__distance_filter, exit_distance=1900)
+        FiniteStateMachine._brown_link(self._robot._distance_sensor,self.__rotate_left, self.__stop_terminal,
+                                       distance_filter=self.__distance_filter, exit_distance=1900)
+        FiniteStateMachine._brown_link(self._robot._distance_sensor,self.__rotate_right, self.__stop_terminal,
+                                       distance_filter=self.__distance_filter, exit_distance=1900)
 
         FiniteStateMachine._green_link(self.__forward,self.__stop_robot)
-        FiniteStateMachine._green_link(self.__rotate_left, self.__stop_robot)
-        FiniteStateMachine._green_link(self.__rotate_right, self.__stop_robot)
+        # les rotations finissent à l'angle atteint (encodeurs lus une fois par tick), la minuterie ne sert que
+        # de garde si une roue est bloquée
+        for rotate_state in (self.__rotate_left, self.__rotate_right):
+            rotate_state.add_transition(ConditionalTransition(rotate_state.motion_complete, self.__stop_robot))
+            FiniteStateMachine._green_link(rotate_state, self.__stop_robot, SecondTask.TURN_TIMEOUT)
         
         FiniteStateMachine._blue_link(self.__stop_robot,self.__random_mouvement_picker_state)
 
@@ -2426,26 +5607,20 @@ class SecondTask(RobotState):
         self.__layout = FiniteStateMachine.Layout()
         self.__layout.initial_state = self.__random_mouvement_picker_state
         self.__layout.add_states([self.__random_mouvement_picker_state,self.__rotate_right,self.__rotate_left,self.__forward,self.__stop_robot,self.__stop_terminal,self.__servo_state_right,self.__servo_state_left,self.__servo_state_forward])
-        self.fsm = FiniteStateMachine(self.__layout)
+        self.__layout.freeze()
+        self.set_region(self.__layout)
 
     def __pick_random_mouvement(self):
         self.__random_mouvement_picker_state.custom_value = random.choice(list(self.PossibleMovements))
         print(self.custom_value)
 
 
-    def _do_entering_action(self) -> None:
-        self.fsm.reset()
-        self.fsm.track()
-        
     def __terminal_exit_action(self)->None:
-        self.fsm.stop()
+        self.region.stop()
         
     def _do_exiting_action(self) -> None:
         self._robot.shut_down()
 
-    def track(self):
-        self.fsm.track()
-
 
 c64 = C64Project()
 c64.run()